@@ -1,36 +1,458 @@
 import os
 import json
 import time
+import hashlib
+import secrets
+import threading
+import ssl
+import http.client
+import base64
+import gzip
+import tempfile
+import re
+import logging
+import contextvars
+import functools
+import mimetypes
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from flask import Flask, request, jsonify, send_from_directory
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+from flask import Flask, Response, request, jsonify, send_file, stream_with_context, has_request_context
 from flask_cors import CORS
 import xmlrpc.client
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import brotli
+except ImportError:
+    brotli = None
 try:
     import redis
-    redis_client = redis.Redis(host='localhost', port=6379, db=0, decode_responses=True)
+    # Tek istemci tüm thread'lerce paylaşılır; bağlantı havuzu thread-safe ve sınırlıdır
+    redis_client = redis.Redis(host=os.environ.get('REDIS_HOST', 'localhost'), port=int(os.environ.get('REDIS_PORT', 6379)), db=0, decode_responses=True,
+                               max_connections=int(os.environ.get('REDIS_MAX_CONNECTIONS', 32)), socket_connect_timeout=1, socket_timeout=2)
     CACHE_ENABLED = True
 except:
     CACHE_ENABLED = False
 
-app = Flask(__name__, static_folder='../frontend/dist', static_url_path='/')
+# Flask'ın kendi statik rotası kapalı; arayüz dosyaları aşağıdaki StaticIndex ile sunulur
+app = Flask(__name__, static_folder=None)
+STATIC_ROOT = os.path.normpath(os.path.join(app.root_path, '..', 'frontend', 'dist'))
 CORS(app)
 
+# ========== Statik Dosyalar (SPA) ==========
+# frontend/dist açılışta bir kez taranır; dosyalar gzip/brotli sıkıştırılmış halleriyle bellekte tutulur.
+# Vite'ın hash'li dosyaları (assets/index-1a2b3c4d.js) içerikleri değişince adları da değiştiği için kalıcı önbelleğe
+# alınır; index.html ve logo gibi hash'siz dosyalar her açılışta ETag ile doğrulanır (değişmediyse 304).
+STATIC_COMPRESS_MIN_SIZE = 1024
+STATIC_COMPRESSIBLE = ('text/', 'application/javascript', 'application/json', 'image/svg+xml', 'application/xml')
+HASHED_ASSET_RE = re.compile(r'^assets/.+-[A-Za-z0-9_-]{8,}\.[a-z0-9]+$')
+
+class StaticIndex:
+    """dist klasöründeki dosyalar: yol -> (mimetype, etag, hash'li mi, {kodlama: gövde})"""
+    def __init__(self, root):
+        self.root, self.files = root, {}
+        for folder, _, names in os.walk(root):
+            for name in names:
+                if name.endswith(('.gz', '.br')): continue
+                full = os.path.join(folder, name)
+                with open(full, 'rb') as f: body = f.read()
+                rel = os.path.relpath(full, root).replace(os.sep, '/')
+                mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+                variants = {None: body}
+                if mimetype.startswith(STATIC_COMPRESSIBLE) and len(body) >= STATIC_COMPRESS_MIN_SIZE:
+                    variants['gzip'] = gzip.compress(body, compresslevel=9)
+                    if brotli is not None: variants['br'] = brotli.compress(body, quality=11)
+                    variants = {enc: b for enc, b in variants.items() if enc is None or len(b) < len(body)}
+                self.files[rel] = (mimetype, hashlib.sha1(body).hexdigest()[:20], bool(HASHED_ASSET_RE.match(rel)), variants)
+
+    def response(self, path):
+        entry = self.files.get(path)
+        if entry is None: return None
+        mimetype, etag, hashed, variants = entry
+        headers = {'ETag': f'"{etag}"', 'Vary': 'Accept-Encoding',
+                   'Cache-Control': 'public, max-age=31536000, immutable' if hashed else 'no-cache'}
+        if request.if_none_match.contains(etag): return Response(status=304, headers=headers)
+        accepted = {e.split(';')[0].strip() for e in request.headers.get('Accept-Encoding', '').split(',')}
+        encoding = next((enc for enc in ('br', 'gzip') if enc in variants and enc in accepted), None)
+        if encoding: headers['Content-Encoding'] = encoding
+        return Response(variants[encoding], mimetype=mimetype, headers=headers)
+
+    def stats(self):
+        return {'files': len(self.files), 'hashed': sum(1 for f in self.files.values() if f[2]),
+                'bytes': sum(len(f[3][None]) for f in self.files.values()),
+                'compressed_bytes': sum(len(f[3].get('br', f[3].get('gzip', f[3][None]))) for f in self.files.values())}
+
+static_files = StaticIndex(STATIC_ROOT)  # dist yoksa (geliştirme ortamı) boş kalır
+
 @app.route('/')
-def index(): return send_from_directory(app.static_folder, 'index.html')
+def index(): return static_proxy('index.html')
 @app.route('/<path:path>')
 def static_proxy(path):
-    if os.path.exists(os.path.join(app.static_folder, path)): return send_from_directory(app.static_folder, path)
-    return send_from_directory(app.static_folder, 'index.html')
+    # Bilinmeyen yollar SPA yönlendirmesi için index.html'e düşer
+    resp = static_files.response(path) or static_files.response('index.html')
+    return resp or (jsonify({'status': 'error', 'message': 'Arayüz derlenmemiş (frontend/dist yok)'}), 404)
+
+# ========== İzleme (Tracing & Metrikler) ==========
+# Her Odoo çağrısı (model, method, süre, sonuç boyutu, hata) o anki isteğin zaman çizelgesine yazılır.
+# İstek sonunda zaman çizelgesi tek satır JSON log olarak basılır; toplamlar /metrics'te Prometheus formatında sunulur.
+logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'INFO'), format='%(message)s')
+log = logging.getLogger('ascari')
+TRACE_LOG = os.environ.get('TRACE_LOG', '1') == '1'
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+_current_trace = contextvars.ContextVar('ascari_trace', default=None)
+
+class Metrics:
+    """Prometheus metin formatında sunulan sayaç ve histogramlar"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = {}      # (endpoint, status) -> sayı
+        self.latency = {}       # endpoint -> [bucket sayıları..., toplam süre, sayı]
+        self.odoo_calls = {}    # (endpoint, model, method, outcome) -> sayı
+        self.odoo_seconds = {}  # (model, method) -> [toplam süre, sayı]
+        self.events = {}        # (olay, endpoint) -> sayı; coalesced / throttled
+
+    def observe_request(self, endpoint, status, seconds):
+        with self._lock:
+            self.requests[(endpoint, status)] = self.requests.get((endpoint, status), 0) + 1
+            h = self.latency.setdefault(endpoint, [0] * len(LATENCY_BUCKETS) + [0.0, 0])
+            for i, b in enumerate(LATENCY_BUCKETS):
+                if seconds <= b: h[i] += 1
+            h[-2] += seconds
+            h[-1] += 1
+
+    def observe_odoo(self, endpoint, model, method, outcome, seconds):
+        with self._lock:
+            key = (endpoint, model, method, outcome)
+            self.odoo_calls[key] = self.odoo_calls.get(key, 0) + 1
+            t = self.odoo_seconds.setdefault((model, method), [0.0, 0])
+            t[0] += seconds
+            t[1] += 1
+
+    def count(self, event, endpoint):
+        with self._lock: self.events[(event, endpoint)] = self.events.get((event, endpoint), 0) + 1
+
+    def render(self):
+        def labels(**kw): return '{' + ','.join(f'{k}="{str(v)}"' for k, v in kw.items()) + '}'
+        out = ['# TYPE ascari_http_requests_total counter']
+        with self._lock:
+            out += [f'ascari_http_requests_total{labels(endpoint=e, status=st)} {n}' for (e, st), n in sorted(self.requests.items())]
+            out.append('# TYPE ascari_http_request_duration_seconds histogram')
+            for e, h in sorted(self.latency.items()):
+                out += [f'ascari_http_request_duration_seconds_bucket{labels(endpoint=e, le=b)} {h[i]}' for i, b in enumerate(LATENCY_BUCKETS)]
+                out.append(f'ascari_http_request_duration_seconds_bucket{labels(endpoint=e, le="+Inf")} {h[-1]}')
+                out.append(f'ascari_http_request_duration_seconds_sum{labels(endpoint=e)} {h[-2]:.6f}')
+                out.append(f'ascari_http_request_duration_seconds_count{labels(endpoint=e)} {h[-1]}')
+            out.append('# TYPE ascari_odoo_calls_total counter')
+            out += [f'ascari_odoo_calls_total{labels(endpoint=e, model=m, method=me, outcome=o)} {n}' for (e, m, me, o), n in sorted(self.odoo_calls.items())]
+            out.append('# TYPE ascari_odoo_call_duration_seconds summary')
+            for (m, me), (total, n) in sorted(self.odoo_seconds.items()):
+                out.append(f'ascari_odoo_call_duration_seconds_sum{labels(model=m, method=me)} {total:.6f}')
+                out.append(f'ascari_odoo_call_duration_seconds_count{labels(model=m, method=me)} {n}')
+            for event in ('coalesced', 'throttled'):
+                out.append(f'# TYPE ascari_requests_{event}_total counter')
+                out += [f'ascari_requests_{event}_total{labels(endpoint=e)} {n}' for (ev, e), n in sorted(self.events.items()) if ev == event]
+        return out
+
+metrics = Metrics()
+
+def trace_odoo_call(model, method, started, result=None, error=None):
+    """OdooModels.execute_kw tarafından her çağrı sonunda çağrılır"""
+    seconds = time.perf_counter() - started
+    trace = _current_trace.get()
+    metrics.observe_odoo(trace['endpoint'] if trace else 'background', model, method, 'error' if error else 'ok', seconds)
+    if trace is not None:
+        trace['calls'].append({'model': model, 'method': method, 'at_ms': round((started - trace['started']) * 1000, 1), 'ms': round(seconds * 1000, 1),
+                               'size': len(result) if isinstance(result, (list, dict)) else 1, 'error': str(error)[:200] if error else None})
+
+def submit_traced(fn, *args):
+    """Arka plan havuzuna iş gönderir; isteğin izleme bağlamı iş parçacığına taşınır"""
+    return _fanout_executor.submit(contextvars.copy_context().run, fn, *args)
+
+@app.before_request
+def start_trace():
+    endpoint = request.url_rule.rule if request.url_rule else 'other'  # /img/product/<int:pid>/... gibi; id başına etiket açılmaz
+    _current_trace.set({'endpoint': endpoint, 'started': time.perf_counter(), 'calls': []})
+
+@app.after_request
+def finish_trace(response):
+    trace = _current_trace.get()
+    if trace is None: return response
+    seconds = time.perf_counter() - trace['started']
+    metrics.observe_request(trace['endpoint'], response.status_code, seconds)
+    if TRACE_LOG and trace['calls']:
+        log.info(json.dumps({'ts': datetime.now().isoformat(timespec='milliseconds'), 'method': request.method, 'endpoint': trace['endpoint'],
+                             'path': request.path, 'status': response.status_code, 'ms': round(seconds * 1000, 1),
+                             'odoo_calls': len(trace['calls']), 'odoo_ms': round(sum(c['ms'] for c in trace['calls']), 1), 'timeline': trace['calls']}, ensure_ascii=False))
+    # Bağlam sıfırlanmaz: NDJSON akışındaki çağrılar da aynı uç noktaya yazılsın (sonraki istek üzerine yazar)
+    return response
+
+# ========== İzleme Uç Noktalarına Erişim ==========
+# /metrics ve *-stats uç noktaları Odoo adreslerini, veritabanı adlarını ve hata metinlerini içerir; internete açık olmamalı.
+# OPS_TOKEN verilirse "Authorization: Bearer <token>" ile, yoksa sadece OPS_ALLOW_IPS'teki adreslerden (varsayılan localhost) erişilir.
+OPS_TOKEN = os.environ.get('OPS_TOKEN', '')
+OPS_ALLOW_IPS = {ip.strip() for ip in os.environ.get('OPS_ALLOW_IPS', '127.0.0.1,::1').split(',') if ip.strip()}
+
+def ops_only(fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        auth = request.headers.get('Authorization', '')
+        if not (OPS_TOKEN and secrets.compare_digest(auth, f'Bearer {OPS_TOKEN}')) and request.remote_addr not in OPS_ALLOW_IPS:
+            return jsonify({'status': 'error', 'message': 'Yetkisiz'}), 403
+        return fn(*args, **kwargs)
+    return wrapper
+
+@app.route('/metrics', methods=['GET'])
+@ops_only
+def prometheus_metrics():
+    """Prometheus metrikleri: uç nokta gecikmeleri, uç nokta başına Odoo çağrıları, önbellek isabetleri"""
+    out = metrics.render()
+    out.append('# TYPE ascari_cache_requests_total counter')
+    for name, c in sorted(ref_cache.stats()['by_name'].items()):
+        for result, key in (('hit', 'hits'), ('redis_hit', 'redis_hits'), ('miss', 'misses')):
+            out.append(f'ascari_cache_requests_total{{cache="ref:{name}",result="{result}"}} {c[key]}')
+    out.append(f'ascari_cache_requests_total{{cache="quote_index",result="rejected"}} {_quote_codes.rejected}')
+    for name, cache in (('quote', _quote_cache), ('quote_negative', _quote_misses), ('quote_partner', _quote_partners)):
+        out.append(f'ascari_cache_requests_total{{cache="{name}",result="hit"}} {cache.hits}')
+        out.append(f'ascari_cache_requests_total{{cache="{name}",result="miss"}} {cache.misses}')
+    pool = odoo_pool.stats()
+    out.append('# TYPE ascari_odoo_pool_connections_total counter')
+    for key in ('hits', 'misses', 'evictions', 'discarded'):
+        out.append(f'ascari_odoo_pool_connections_total{{result="{key}"}} {pool[key]}')
+    out.append('# TYPE ascari_single_flight_in_flight gauge')
+    out.append(f'ascari_single_flight_in_flight {_single_flight.in_flight()}')
+    out.append('# TYPE ascari_dashboard_snapshot_age_seconds gauge')
+    with _snapshots_lock: snaps = list(_snapshots.items())
+    for (url, db, user), snap in snaps:
+        st = snap.stats()
+        if st['age'] is not None: out.append(f'ascari_dashboard_snapshot_age_seconds{{db="{db}",user="{user}"}} {st["age"]}')
+        out.append(f'ascari_dashboard_snapshot_failures_total{{db="{db}",user="{user}"}} {st["failures"]}')
+    return Response('\n'.join(out) + '\n', mimetype='text/plain; version=0.0.4')
+
+# ========== Odoo Bağlantı Havuzu ==========
+# Her execute_kw için yeni TCP/TLS el sıkışması yapılmaması için host başına keep-alive bağlantılar
+POOL_SIZE = int(os.environ.get('ODOO_POOL_SIZE', os.environ.get('GUNICORN_THREADS', 16)))
+POOL_IDLE_TIMEOUT = float(os.environ.get('ODOO_POOL_IDLE', 60))
+CONNECT_TIMEOUT = float(os.environ.get('ODOO_CONNECT_TIMEOUT', 5))
+READ_TIMEOUT = float(os.environ.get('ODOO_READ_TIMEOUT', 60))
+
+class ConnectionPool:
+    """Host başına boşta bekleyen HTTP/1.1 bağlantılarını tutar"""
+    def __init__(self, max_size=POOL_SIZE, idle_timeout=POOL_IDLE_TIMEOUT, connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT):
+        self.max_size, self.idle_timeout = max_size, idle_timeout
+        self.connect_timeout, self.read_timeout = connect_timeout, read_timeout
+        self._idle = {}  # (scheme, host) -> [(conn, last_used), ...]
+        self._lock = threading.Lock()
+        self._ssl_context = ssl.create_default_context()
+        self.hits = self.misses = self.evictions = self.discarded = 0
+
+    def acquire(self, scheme, host):
+        now = time.time()
+        with self._lock:
+            idle = self._idle.get((scheme, host), [])
+            while idle:
+                conn, last_used = idle.pop()
+                if now - last_used <= self.idle_timeout:
+                    self.hits += 1
+                    return conn
+                self.evictions += 1
+                conn.close()
+            self.misses += 1
+        if scheme == 'https': conn = http.client.HTTPSConnection(host, timeout=self.connect_timeout, context=self._ssl_context)
+        else: conn = http.client.HTTPConnection(host, timeout=self.connect_timeout)
+        conn.connect()
+        conn.sock.settimeout(self.read_timeout)
+        return conn
 
-def get_conn(data):
-    url = data.get('url','').rstrip('/')
+    def release(self, scheme, host, conn):
+        with self._lock:
+            idle = self._idle.setdefault((scheme, host), [])
+            if conn.sock is not None and len(idle) < self.max_size:
+                idle.append((conn, time.time()))
+                return
+            self.discarded += 1
+        conn.close()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions, 'discarded': self.discarded,
+                'hit_rate': round(self.hits / total, 3) if total else 0,
+                'idle': {f'{k[0]}://{k[1]}': len(v) for k, v in self._idle.items()},
+                'max_size': self.max_size
+            }
+
+odoo_pool = ConnectionPool()
+
+class PooledTransport(xmlrpc.client.Transport):
+    """Bağlantıyı havuzdan alan ve çağrı sonunda geri bırakan XML-RPC transport'u"""
+    def __init__(self, pool, scheme):
+        super().__init__()
+        self.pool, self.scheme = pool, scheme
+
+    def make_connection(self, host):
+        if self._connection[1] is not None: return self._connection[1]
+        chost, self._extra_headers, _ = self.get_host_info(host)
+        self._connection = host, self.pool.acquire(self.scheme, chost)
+        return self._connection[1]
+
+    def release(self):
+        host, conn = self._connection
+        self._connection = (None, None)
+        if conn is not None: self.pool.release(self.scheme, self.get_host_info(host)[0], conn)
+
+def odoo_rpc(url, service, method, *args):
+    """/xmlrpc/2/<service> üzerinde havuzlu bağlantıyla tek çağrı yapar"""
+    transport = PooledTransport(odoo_pool, url.split('://')[0])
+    proxy = xmlrpc.client.ServerProxy(f'{url}/xmlrpc/2/{service}', transport=transport)
+    try: return getattr(proxy, method)(*args)
+    finally: transport.release()
+
+# Oturumlar, referans veri önbelleği ve teklif kayıtları bu sınırlı LRU'yu kullanır; süresi dolan kayıt okunurken atılır
+class LRUCache:
+    """Boyut ve TTL sınırlı, thread-safe LRU"""
+    def __init__(self, max_size, ttl):
+        self.max_size, self.ttl = max_size, ttl
+        self._data = OrderedDict()  # key -> (value, expires_at)
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry and entry[1] <= time.time():
+                del self._data[key]
+                entry = None
+            if not entry:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._data.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._data[key] = (value, time.time() + (ttl or self.ttl))
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size: self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock: self._data.pop(key, None)
+
+    def __len__(self): return len(self._data)
+
+# ========== Oturum Katmanı ==========
+# authenticate sonucu (url, db, username) için TTL ile tutulur; her istekte Odoo'ya ekstra tur atılmaz
+AUTH_TTL = int(os.environ.get('ODOO_AUTH_TTL', 600))
+SESSION_TTL = int(os.environ.get('PANEL_SESSION_TTL', 43200))
+_auth_cache = {}  # (url, db, username) -> (uid, pwd_digest, expires_at)
+SESSION_MAX = int(os.environ.get('PANEL_SESSION_MAX', 10000))
+_sessions = LRUCache(SESSION_MAX, SESSION_TTL)  # token -> creds; süresi dolan ve en eski oturumlar atılır
+_auth_lock = threading.Lock()
+
+def normalize_url(url):
+    url = (url or '').rstrip('/')
     for s in ['/web','/odoo','#']: 
         if url.endswith(s): url = url.split(s)[0]
     if not url.startswith('http'): url = 'https://' + url
+    return url
+
+def _pwd_digest(pwd): return hashlib.sha256((pwd or '').encode()).hexdigest()
+
+def invalidate_auth(url, db, uid):
+    """Önbellekteki uid kaydını siler (yetki hatasında çağrılır)"""
+    with _auth_lock:
+        for key in [k for k, v in _auth_cache.items() if k[:2] == (url, db) and v[0] == uid]: _auth_cache.pop(key, None)
+
+def get_conn(data, force=False):
+    url = normalize_url(data.get('url',''))
     common = xmlrpc.client.ServerProxy(f'{url}/xmlrpc/2/common')
-    uid = common.authenticate(data.get('db'), data.get('username'), data.get('password'), {})
+    key = (url, data.get('db'), data.get('username'))
+    digest = _pwd_digest(data.get('password'))
+    now = time.time()
+    if not force:
+        with _auth_lock: cached = _auth_cache.get(key)
+        if cached and cached[1] == digest and cached[2] > now: return url, cached[0], common
+    uid = odoo_rpc(url, 'common', 'authenticate', data.get('db'), data.get('username'), data.get('password'), {})
+    with _auth_lock:
+        if uid: _auth_cache[key] = (uid, digest, now + AUTH_TTL)
+        else: _auth_cache.pop(key, None)
+    return url, uid, common
+
+def get_auth_conn(data):
+    """get_conn gibi; giriş başarısızsa hata fırlatır. Önbellekten yanıt veren uç noktalar önbelleğe dokunmadan önce bunu çağırır."""
+    url, uid, common = get_conn(data)
+    if not uid: raise PermissionError('Giriş başarısız')
     return url, uid, common
 
+def _is_auth_error(e):
+    return isinstance(e, xmlrpc.client.Fault) and 'AccessDenied' in str(e.faultString)
+
+class OdooModels:
+    """/xmlrpc/2/object sarmalayıcısı; havuzlu bağlantı kullanır, yetki hatasında uid önbelleğini temizler"""
+    def __init__(self, url):
+        self.url = url
+
+    def execute_kw(self, db, uid, pwd, model, method, args, kw=None):
+        started = time.perf_counter()
+        try:
+            result = odoo_rpc(self.url, 'object', 'execute_kw', db, uid, pwd, model, method, args, kw or {})
+        except Exception as e:
+            trace_odoo_call(model, method, started, error=e)
+            if _is_auth_error(e):
+                invalidate_auth(self.url, db, uid)
+                if has_request_context(): drop_session((request.get_json(silent=True) or {}).get('session'))
+            raise
+        trace_odoo_call(model, method, started, result)
+        return result
+
+def get_models(url): return OdooModels(url)
+
+def create_session(creds):
+    token = secrets.token_urlsafe(32)
+    _sessions.set(token, creds)
+    # Birden fazla gunicorn worker'ı için Redis'e de yaz
+    if CACHE_ENABLED:
+        try: redis_client.setex(f'session:{token}', SESSION_TTL, json.dumps(creds))
+        except: pass
+    return token
+
+def get_session(token):
+    if not token: return None
+    creds = _sessions.get(token)
+    if creds:
+        _sessions.set(token, creds)  # Kayan süre
+        return creds
+    if CACHE_ENABLED:
+        try:
+            raw = redis_client.get(f'session:{token}')
+            if raw:
+                creds = json.loads(raw)
+                _sessions.set(token, creds)
+                return creds
+        except: pass
+    return None
+
+def drop_session(token):
+    if not token: return
+    _sessions.pop(token)
+    if CACHE_ENABLED:
+        try: redis_client.delete(f'session:{token}')
+        except: pass
+
+@app.before_request
+def resolve_session():
+    """Oturum anahtarı ile gelen isteklere kayıtlı bağlantı bilgilerini ekler"""
+    if not request.path.startswith('/api/') or request.method != 'POST' or request.path == '/api/logout': return
+    d = request.get_json(silent=True)
+    if not isinstance(d, dict) or not d.get('session'): return
+    creds = get_session(d['session'])
+    if not creds: return jsonify({'status': 'error', 'message': 'Oturum süresi doldu'}), 401
+    d.update(creds)
+
 def build_tree(cats):
     tree, lookup = [], {}
     for c in cats: c['children'] = []; lookup[c['id']] = c
@@ -39,138 +461,838 @@ def build_tree(cats):
         else: tree.append(c)
     return tree
 
+# ========== İstek Birleştirme ve Hız Sınırı ==========
+# Mağaza açılışında tabletler aynı anda aynı dashboard/arama isteklerini gönderir. Aynı anahtarlı eşzamanlı
+# okuma isteklerinden sadece ilki Odoo'ya gider, diğerleri onun yanıtını paylaşır. Anahtar veritabanı, uç nokta,
+# parametreler ve kimlik bilgisinin hash'idir (yanlış şifreli bir istek başkasının yanıtına ortak olamaz).
+# Ayrıca kullanıcı/veritabanı başına token bucket, tuş vuruşu fırtınalarında Odoo'yu korur (worker başına tutulur).
+COALESCE_WAIT = float(os.environ.get('COALESCE_WAIT', READ_TIMEOUT))
+COALESCE_IGNORED = {'session', 'url', 'db', 'username', 'password', 'uid'}
+RATE_LIMIT_RATE = float(os.environ.get('RATE_LIMIT_RATE', 10))    # saniyede eklenen token
+RATE_LIMIT_BURST = float(os.environ.get('RATE_LIMIT_BURST', 40))  # kova kapasitesi
+RATE_LIMIT_MAX_BUCKETS = 10000
+
+class SingleFlight:
+    """Aynı anahtarla eşzamanlı gelen çağrılardan sadece ilki çalışır, diğerleri sonucunu bekler"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}  # anahtar -> {'done', 'result', 'error'}
+
+    def do(self, key, fn):
+        """(sonuç, paylaşıldı_mı) döner; bekleme COALESCE_WAIT'i aşarsa çağrı ayrıca çalıştırılır"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader: call = self._calls[key] = {'done': threading.Event(), 'result': None, 'error': None}
+        if not leader:
+            if not call['done'].wait(COALESCE_WAIT): return fn(), False
+            if call['error'] is not None: raise call['error']
+            return call['result'], True
+        try:
+            call['result'] = fn()
+            return call['result'], False
+        except Exception as e:
+            call['error'] = e
+            raise
+        finally:
+            with self._lock: self._calls.pop(key, None)
+            call['done'].set()
+
+    def in_flight(self):
+        with self._lock: return len(self._calls)
+
+_single_flight = SingleFlight()
+
+def coalesced(view):
+    """Okuma uç noktaları için: eşzamanlı aynı istekler tek Odoo sorgusunu paylaşır.
+    ETag ve sıkıştırma isteğe göre değiştiği için If-None-Match ve Accept-Encoding de anahtara girer; akışlar birleştirilmez."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        d = request.get_json(silent=True) or {}
+        if d.get('stream'): return view(*args, **kwargs)
+        params = {k: v for k, v in d.items() if k not in COALESCE_IGNORED}
+        key = hashlib.sha256(json.dumps([normalize_url(d.get('url') or ''), d.get('db'), d.get('username'), d.get('password'), request.path,
+                                         params, request.headers.get('Accept-Encoding', ''), request.headers.get('If-None-Match', '')],
+                                        sort_keys=True, default=str).encode()).hexdigest()
+        def run():
+            resp = app.make_response(view(*args, **kwargs))
+            return resp.status_code, list(resp.headers), resp.get_data()
+        (status, headers, body), shared = _single_flight.do(key, run)
+        if shared: metrics.count('coalesced', request.url_rule.rule)
+        return Response(body, status=status, headers=headers)
+    return wrapper
+
+class TokenBucket:
+    """Anahtar başına token bucket; take() izin yoksa bir sonraki token için beklenecek süreyi döner"""
+    def __init__(self, rate, burst):
+        self.rate, self.burst = rate, burst
+        self._lock = threading.Lock()
+        self._buckets = {}  # anahtar -> [token, son güncelleme]
+
+    def take(self, key, cost=1):
+        now = time.monotonic()
+        with self._lock:
+            if len(self._buckets) > RATE_LIMIT_MAX_BUCKETS:
+                # Uzun süredir dolu olan kovalar silinir (silinen kova zaten tam kapasiteyle yeniden başlar)
+                self._buckets = {k: b for k, b in self._buckets.items() if now - b[1] < self.burst / self.rate}
+            tokens, last = self._buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            if tokens < cost:
+                self._buckets[key] = [tokens, now]
+                return (cost - tokens) / self.rate
+            self._buckets[key] = [tokens - cost, now]
+            return 0
+
+rate_limiter = TokenBucket(RATE_LIMIT_RATE, RATE_LIMIT_BURST)
+
+@app.before_request
+def limit_rate():
+    """Oturumu çözülmüş /api isteklerini kullanıcı/veritabanı başına sınırlar"""
+    if RATE_LIMIT_RATE <= 0 or not request.path.startswith('/api/') or request.method != 'POST': return
+    d = request.get_json(silent=True)
+    if not isinstance(d, dict) or not d.get('db'): return
+    wait = rate_limiter.take((normalize_url(d.get('url') or ''), d['db'], d.get('username')))
+    if wait:
+        metrics.count('throttled', request.url_rule.rule if request.url_rule else 'other')
+        resp = jsonify({'status': 'error', 'message': 'Çok fazla istek, lütfen biraz bekleyin'})
+        resp.headers['Retry-After'] = str(max(1, int(wait + 0.999)))
+        return resp, 429
+
 @app.route('/api/connect', methods=['POST'])
 def connect():
+    d = request.json
     try:
-        _, uid, _ = get_conn(request.json)
-        return jsonify({"status": "success", "uid": uid}) if uid else jsonify({"status": "error", "message": "Giriş başarısız"})
+        url, uid, _ = get_conn(d, force=True)
+        if not uid: return jsonify({"status": "error", "message": "Giriş başarısız"})
+        session = create_session({'url': url, 'db': d.get('db'), 'username': d.get('username'), 'password': d.get('password')})
+        resp = jsonify({"status": "success", "uid": uid, "session": session})
+        # <img> istekleri gövde gönderemediği için görsel uç noktası oturumu çerezden okur
+        resp.set_cookie('panel_session', session, max_age=SESSION_TTL, httponly=True, samesite='Strict', secure=request.is_secure)
+        return resp
     except Exception as e: return jsonify({"status": "error", "message": str(e)})
 
-@app.route('/api/dashboard-data', methods=['POST'])
-def data():
+@app.route('/api/logout', methods=['POST'])
+def logout():
+    drop_session((request.json or {}).get('session'))
+    resp = jsonify({"status": "success"})
+    resp.delete_cookie('panel_session')
+    return resp
+
+@app.route('/api/pool-stats', methods=['GET'])
+@ops_only
+def pool_stats():
+    """Odoo bağlantı havuzu istatistikleri"""
+    return jsonify({'status': 'success', 'pool': odoo_pool.stats()})
+
+# ========== Referans Veri Önbelleği ==========
+# Vergiler, yevmiyeler, kategori ağacı ve partner etiketi gibi nadiren değişen veriler veritabanı başına TTL ile tutulur.
+# Redis varsa tüm gunicorn worker'ları aynı önbelleği paylaşır; Redis erişilemezse bir süre sadece bellek kullanılır.
+REF_TTLS = {name: int(os.environ.get(f'REF_TTL_{name.upper()}', default)) for name, default in [
+    ('taxes', 3600), ('journals', 3600), ('categories', 600), ('partner_tag', 86400), ('walkin_partner', 86400), ('helpdesk_stats', 30), ('customer', 60)
+]}
+REDIS_RETRY_AFTER = 30
+REF_CACHE_SIZE = int(os.environ.get('REF_CACHE_SIZE', 4096))  # customer:<id> gibi kayıt başına girdiler sınırsız büyümesin
+_MISSING = object()
+
+class RefCache:
+    """(url, db, ad) anahtarlı, TTL'li, isteğe bağlı Redis destekli önbellek"""
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self._local = LRUCache(REF_CACHE_SIZE, 600)  # (url, db, name) -> value; süresi dolan ve en eski kayıtlar atılır
+        self._lock = threading.Lock()
+        self._redis_down_until = 0
+        self.stats_by_name = {}  # name -> {'hits', 'redis_hits', 'misses', 'invalidations'}
+
+    def _count(self, name, field):
+        name = name.split(':')[0]  # customer:<id> gibi kayıtlar tek başlıkta sayılır
+        with self._lock:
+            counters = self.stats_by_name.setdefault(name, {'hits': 0, 'redis_hits': 0, 'misses': 0, 'invalidations': 0})
+            counters[field] += 1
+
+    def _redis_key(self, url, db, name): return f'{self.prefix}:{url}|{db}:{name}'
+
+    def _redis(self, fn):
+        if not CACHE_ENABLED or time.time() < self._redis_down_until: return None
+        try: return fn(redis_client)
+        except Exception:
+            self._redis_down_until = time.time() + REDIS_RETRY_AFTER
+            return None
+
+    def get(self, url, db, name, loader, ttl=None, cache_if=None):
+        """Önbellekte yoksa loader() ile yükler; değer JSON'a çevrilebilir olmalıdır.
+        cache_if(değer) False dönerse değer önbelleğe yazılmadan döndürülür."""
+        ttl = ttl or REF_TTLS.get(name, 600)
+        key = (url, db, name)
+        value = self._local.get(key, _MISSING)
+        if value is not _MISSING:
+            self._count(name, 'hits')
+            return value
+        raw = self._redis(lambda r: r.get(self._redis_key(url, db, name)))
+        if raw is not None:
+            self._count(name, 'redis_hits')
+            value = json.loads(raw)
+        else:
+            self._count(name, 'misses')
+            value = loader()
+            if cache_if is not None and not cache_if(value): return value
+            self._redis(lambda r: r.setex(self._redis_key(url, db, name), ttl, json.dumps(value)))
+        self._local.set(key, value, ttl)
+        return value
+
+    def has(self, url, db, name):
+        return self._local.get((url, db, name), _MISSING) is not _MISSING
+
+    def invalidate(self, url, db, name=None):
+        """Tek bir kaydı veya (name verilmezse) veritabanının tüm kayıtlarını siler"""
+        names = [name] if name else list(REF_TTLS)
+        for n in names: self._local.pop((url, db, n))
+        for n in names:
+            self._count(n, 'invalidations')
+            self._redis(lambda r: r.delete(self._redis_key(url, db, n)))
+
+    def stats(self):
+        with self._lock:
+            out = {}
+            for name, c in self.stats_by_name.items():
+                total = c['hits'] + c['redis_hits'] + c['misses']
+                out[name] = dict(c, hit_rate=round((c['hits'] + c['redis_hits']) / total, 3) if total else 0)
+            return {'entries': len(self._local), 'redis': CACHE_ENABLED and time.time() >= self._redis_down_until, 'by_name': out}
+
+ref_cache = RefCache('ref')
+
+# Kayıt kurallarına tabi veriler (müşteri 360, helpdesk sayıları) kullanıcı başına önbelleklenir. Bir kayıt değiştiğinde
+# o veriyi önbelleğe almış tüm kullanıcıların kaydı silinsin diye (url, db, ad) -> {uid} tutulur.
+_user_scoped = LRUCache(REF_CACHE_SIZE, max(REF_TTLS['customer'], REF_TTLS['helpdesk_stats']))
+_user_scoped_lock = threading.Lock()
+
+def user_cache_name(url, db, name, uid):
+    with _user_scoped_lock:
+        uids = _user_scoped.get((url, db, name)) or set()
+        uids.add(uid)
+        _user_scoped.set((url, db, name), uids)
+    return f'{name}:u{uid}'
+
+def invalidate_user_scoped(url, db, name):
+    with _user_scoped_lock:
+        uids = _user_scoped.get((url, db, name)) or set()
+        _user_scoped.pop((url, db, name))
+    for uid in uids: ref_cache.invalidate(url, db, f'{name}:u{uid}')
+
+def get_tax_rates(models, db, uid, pwd, tax_ids=()):
+    """Tüm vergilerin {id: oran} sözlüğü; bilinmeyen vergi görülürse önbellek bir kez yenilenir"""
+    load = lambda: models.execute_kw(db, uid, pwd, 'account.tax', 'search_read', [[]],
+        {'fields': ['id', 'amount'], 'context': {'active_test': False}})
+    taxes = ref_cache.get(models.url, db, 'taxes', load)
+    rates = {t['id']: t['amount'] for t in taxes}
+    if any(t not in rates for t in tax_ids):
+        ref_cache.invalidate(models.url, db, 'taxes')
+        rates = {t['id']: t['amount'] for t in ref_cache.get(models.url, db, 'taxes', load)}
+    return rates
+
+@app.route('/api/cache-stats', methods=['GET'])
+@ops_only
+def cache_stats():
+    """Referans veri önbelleği isabet oranları ve statik dosya indeksi"""
+    return jsonify({'status': 'success', 'ref_cache': ref_cache.stats(), 'static': static_files.stats()})
+
+@app.route('/api/cache/invalidate', methods=['POST'])
+def cache_invalidate():
+    """Bağlı veritabanının referans verilerini (veya sadece 'name' kaydını) siler"""
     d = request.json
     try:
         url, uid, _ = get_conn(d)
-        models = xmlrpc.client.ServerProxy(f'{url}/xmlrpc/2/object')
-        db, pwd = d.get('db'), d.get('password')
+        if not uid: return jsonify({'status': 'error', 'message': 'Giriş başarısız'})
+        ref_cache.invalidate(url, d.get('db'), d.get('name'))
+        return jsonify({'status': 'success'})
+    except Exception as e: return jsonify({'status': 'error', 'message': str(e)})
 
-        # 1. Kategoriler (Sadece Ticari Mal ve Alt Kategorileri)
-        # Önce "Ticari Mal" kategorisini bul
-        commercial_cats = models.execute_kw(db, uid, pwd, 'product.category', 'search_read', 
-            [[['name', 'ilike', 'Ticari Mal']]], {'fields': ['id', 'name'], 'limit': 1})
-        
-        if commercial_cats:
-            commercial_id = commercial_cats[0]['id']
-            # Ticari Mal ve alt kategorilerini getir
-            cats = models.execute_kw(db, uid, pwd, 'product.category', 'search_read', 
-                [['|', ['id', '=', commercial_id], ['parent_id', 'child_of', commercial_id]]], 
-                {'fields': ['id', 'name', 'parent_id']})
-        else:
-            # Ticari Mal bulunamazsa tüm kategorileri getir
-            cats = models.execute_kw(db, uid, pwd, 'product.category', 'search_read', [], {'fields': ['id', 'name', 'parent_id']})
-        
-        categories = build_tree(cats)
+# ========== Ürün Görselleri ==========
+# Görseller JSON içine base64 olarak gömülmez; içerik hash'i ile diske yazılır ve /img/product/<id>/<size> üzerinden sunulur.
+# URL'deki ?v=<hash> içerik değişince değiştiği için tarayıcı görseli süresiz önbellekleyebilir.
+IMAGE_CACHE_DIR = os.environ.get('IMAGE_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'ascari-img'))
+IMAGE_SIZES = (128, 256, 512, 1024, 1920)
+os.makedirs(IMAGE_CACHE_DIR, exist_ok=True)
+_image_index = {}       # (url, db, product_id, size) -> hash
+_known_images = set()   # Diske yazılmış hash'ler
+_image_lock = threading.Lock()
 
-        # 2. Ürünler (Limit 1000) - Kurulu ölçüler + KDV bilgisi dahil
-        prods = models.execute_kw(db, uid, pwd, 'product.product', 'search_read', [[['sale_ok','=',True]]], 
-            {'fields': ['id', 'display_name', 'default_code', 'list_price', 'categ_id', 'image_128', 
-                        'x_assembled_width', 'x_assembled_depth', 'x_assembled_height', 'qty_available', 'taxes_id'], 'limit': 1000})
-        
-        # Tüm unique tax ID'leri topla (PERFORMANS İÇİN BATCH)
-        all_tax_ids = set()
-        for p in prods:
-            if p.get('taxes_id'):
-                all_tax_ids.update(p['taxes_id'])
-        
-        print(f"DEBUG: Found {len(all_tax_ids)} unique tax IDs")  # DEBUG
-        
-        # Tek seferde tüm vergileri çek (HIZLI!)
-        tax_rates = {}
-        if all_tax_ids:
-            try:
-                taxes = models.execute_kw(db, uid, pwd, 'account.tax', 'read', [list(all_tax_ids)], {'fields': ['id', 'amount']})
-                print(f"DEBUG: Retrieved {len(taxes)} taxes from Odoo")  # DEBUG
-                print(f"DEBUG: First tax example: {taxes[0] if taxes else 'NONE'}")  # DEBUG
-                tax_rates = {t['id']: t['amount'] for t in taxes}
-            except Exception as e:
-                print(f"ERROR: Failed to fetch taxes: {e}")  # DEBUG
-                pass
-        
-        # Ürünlere KDV oranını ata
-        products = []
-        for p in prods:
-            tax_rate = 0
-            if p.get('taxes_id') and p['taxes_id']:
-                # İlk verginin oranını al
-                first_tax_id = p['taxes_id'][0]
-                tax_rate = tax_rates.get(first_tax_id, 0)
-                
-                # İlk ürün için debug
-                if len(products) == 0:
-                    print(f"DEBUG: First product '{p['display_name']}' has tax_ids={p['taxes_id']}, tax_rate={tax_rate}")  # DEBUG
-            
-            products.append({
-                'id': p['id'], 
-                'name': p['display_name'], 
-                'default_code': p['default_code'] or '', 
-                'list_price': p['list_price'], 
-                'image_128': p['image_128'], 
-                'categ_path': str(p['categ_id']),
-                'x_assembled_width': p.get('x_assembled_width', ''), 
-                'x_assembled_depth': p.get('x_assembled_depth', ''),
-                'x_assembled_height': p.get('x_assembled_height', ''),
-                'qty_available': p.get('qty_available', 0),
-                'tax_rate': tax_rate  # KDV oranı (örn: 20, 10, 8)
-            })
+def store_image(url, db, pid, b64, size=128):
+    """Base64 görseli diske yazar, hash'ini döner (görsel yoksa None)"""
+    if not b64:
+        with _image_lock: _image_index.pop((url, db, pid, size), None)
+        return None
+    h = hashlib.sha1(b64.encode() if isinstance(b64, str) else b64).hexdigest()[:20]
+    with _image_lock:
+        _image_index[(url, db, pid, size)] = h
+        if h in _known_images: return h
+    path = os.path.join(IMAGE_CACHE_DIR, h)
+    if not os.path.exists(path):
+        tmp = f'{path}.{threading.get_ident()}.tmp'
+        with open(tmp, 'wb') as f: f.write(base64.b64decode(b64))
+        os.replace(tmp, path)
+    with _image_lock: _known_images.add(h)
+    return h
 
-        # 3. Siparişler (Limit 100) - Teklifler (draft) dahil
-        orders = models.execute_kw(db, uid, pwd, 'sale.order', 'search_read', [], 
-            {'fields': ['id', 'name', 'partner_id', 'date_order', 'amount_total', 'state', 'client_order_ref'], 
-             'limit': 100, 'order': 'date_order desc'})
-        clean_orders = [{'id_raw': o['id'], 'name': o['name'], 'customer': o['partner_id'][1], 
-                        'date': o['date_order'], 'amount': o['amount_total'], 'status': o['state'],
-                        'quote_code': o.get('client_order_ref', '')} for o in orders]
+def image_url(pid, h, size=128):
+    return f'/img/product/{pid}/{size}?v={h}' if h else None
 
-        # 4. Kontaklar (Güvenli Çekim - Try/Except)
-        customers = []
-        try:
-             partners_raw = models.execute_kw(db, uid, pwd, 'res.partner', 'search_read', [], {'fields': ['id', 'name', 'phone', 'email', 'total_due', 'is_company'], 'limit': 50})
-             # Not: total_due yoksa 0 ata
-             customers = [{'id': p['id'], 'name': p['name'], 'phone': p['phone'] or '', 'email': p['email'] or '', 'balance': p.get('total_due', 0), 'type': 'company' if p['is_company'] else 'individual'} for p in partners_raw]
-        except: pass
+def _image_mimetype(head):
+    if head.startswith(b'\x89PNG'): return 'image/png'
+    if head.startswith(b'\xff\xd8'): return 'image/jpeg'
+    if head.startswith(b'GIF8'): return 'image/gif'
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP': return 'image/webp'
+    if head.lstrip().startswith(b'<'): return 'image/svg+xml'
+    return 'application/octet-stream'
 
-        # 5. Helpdesk (Hata Kontrollü)
-        tickets = []
+@app.route('/img/product/<int:pid>/<int:size>', methods=['GET'])
+def product_image(pid, size):
+    """Ürün görselini diskteki önbellekten sunar; yoksa oturum çerezi ile Odoo'dan çeker"""
+    if size not in IMAGE_SIZES: return jsonify({'status': 'error', 'message': 'Geçersiz boyut'}), 404
+    h = request.args.get('v', '')
+    path = os.path.join(IMAGE_CACHE_DIR, h) if h.isalnum() else None
+    if not path or not os.path.exists(path):
+        creds = get_session(request.cookies.get('panel_session'))
+        if not creds: return jsonify({'status': 'error', 'message': 'Oturum süresi doldu'}), 401
         try:
-            raw_t = models.execute_kw(db, uid, pwd, 'helpdesk.ticket', 'search_read', [], {'fields': ['id', 'name', 'partner_id', 'stage_id', 'description'], 'limit': 50})
-            tickets = [{'id': t['id'], 'product': t['name'], 'customer': t['partner_id'][1] if t['partner_id'] else '-', 'issue': t['description'] or '-', 'status': 'new'} for t in raw_t]
-        except: pass
+            url, uid, _ = get_conn(creds)
+            with _image_lock: h = _image_index.get((url, creds['db'], pid, size))
+            path = os.path.join(IMAGE_CACHE_DIR, h) if h else None
+            if not path or not os.path.exists(path):
+                rows = get_models(url).execute_kw(creds['db'], uid, creds['password'], 'product.product', 'read', [[pid]], {'fields': [f'image_{size}']})
+                h = store_image(url, creds['db'], pid, rows[0][f'image_{size}'] if rows else None, size)
+                if not h: return jsonify({'status': 'error', 'message': 'Görsel bulunamadı'}), 404
+                path = os.path.join(IMAGE_CACHE_DIR, h)
+        except Exception as e: return jsonify({'status': 'error', 'message': str(e)}), 502
+    with open(path, 'rb') as f: mimetype = _image_mimetype(f.read(16))
+    resp = send_file(path, mimetype=mimetype, etag=h, conditional=True)
+    # Sürümlü URL içerikle birlikte değişir; sürümsüz URL her seferinde ETag ile doğrulanır
+    resp.headers['Cache-Control'] = 'public, max-age=31536000, immutable' if request.args.get('v') else 'private, no-cache'
+    return resp
+
+# ========== Sıkıştırılmış / Koşullu Yanıtlar ==========
+# Büyük JSON yanıtlar hızlı kodlayıcıyla (orjson varsa) üretilir, içerik hash'i ETag olur ve
+# istemcinin If-None-Match başlığı eşleşirse gövdesiz 304 döner. Gövde br/gzip ile sıkıştırılır.
+COMPRESS_MIN_SIZE = 1024
+
+def fast_dumps(payload):
+    if orjson is not None: return orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':'), default=str).encode()
+
+def compress_body(body):
+    """Accept-Encoding'e göre (gövde, kodlama) döner"""
+    if len(body) < COMPRESS_MIN_SIZE: return body, None
+    accepted = {e.split(';')[0].strip() for e in request.headers.get('Accept-Encoding', '').split(',')}
+    if brotli is not None and 'br' in accepted: return brotli.compress(body, quality=5), 'br'
+    if 'gzip' in accepted: return gzip.compress(body, compresslevel=6), 'gzip'
+    return body, None
+
+def compact_response(payload, volatile=()):
+    """ETag'li, sıkıştırılmış JSON yanıt; volatile anahtarlar (ör. süre ölçümleri) ETag'e dahil edilmez"""
+    body = fast_dumps(payload)
+    stable = fast_dumps({k: v for k, v in payload.items() if k not in volatile}) if volatile else body
+    etag = hashlib.sha1(stable).hexdigest()[:20]
+    headers = {'ETag': f'"{etag}"', 'Vary': 'Accept-Encoding', 'Cache-Control': 'private, no-cache'}
+    if request.if_none_match.contains(etag): return Response(status=304, headers=headers)
+    body, encoding = compress_body(body)
+    if encoding: headers['Content-Encoding'] = encoding
+    return Response(body, mimetype='application/json', headers=headers)
+
+# ========== Dashboard Bölümleri ==========
+# Bölümler birbirinden bağımsız olduğu için paralel çekilir; sadece vergiler ürünleri bekler
+# İstek thread'lerinin her biri birden fazla bölüm başlattığı için varsayılan, istek thread sayısının iki katıdır
+FANOUT_WORKERS = int(os.environ.get('ODOO_FANOUT_WORKERS', 2 * int(os.environ.get('GUNICORN_THREADS', 16))))
+_fanout_executor = ThreadPoolExecutor(max_workers=FANOUT_WORKERS, thread_name_prefix='odoo-fanout')
+
+# Bölüm başına süre sınırı (saniye); DASHBOARD_TIMEOUT_<BÖLÜM> ile değiştirilebilir
+SECTION_DEADLINES = {name: float(os.environ.get(f'DASHBOARD_TIMEOUT_{name.upper()}', default)) for name, default in [
+    ('categories', 10), ('products', 20), ('taxes', 25), ('orders', 15), ('customers', 10), ('tickets', 10), ('invoices', 10)
+]}
+
+def fetch_categories(models, db, uid, pwd):
+    return get_category_index(models, db, uid, pwd).tree
+
+def load_categories(models, db, uid, pwd):
+    # 1. Kategoriler (Sadece Ticari Mal ve Alt Kategorileri)
+    # Önce "Ticari Mal" kategorisini bul
+    commercial_cats = models.execute_kw(db, uid, pwd, 'product.category', 'search_read', 
+        [[['name', 'ilike', 'Ticari Mal']]], {'fields': ['id', 'name'], 'limit': 1})
+    
+    if commercial_cats:
+        commercial_id = commercial_cats[0]['id']
+        # Ticari Mal ve alt kategorilerini getir
+        cats = models.execute_kw(db, uid, pwd, 'product.category', 'search_read', 
+            [['|', ['id', '=', commercial_id], ['parent_id', 'child_of', commercial_id]]], 
+            {'fields': ['id', 'name', 'parent_id']})
+    else:
+        # Ticari Mal bulunamazsa tüm kategorileri getir
+        cats = models.execute_kw(db, uid, pwd, 'product.category', 'search_read', [], {'fields': ['id', 'name', 'parent_id']})
+    
+    return cats
+
+class CategoryIndex:
+    """Kategori ağacı, tam yol adları ve her kategorinin ata/alt küme kümeleri (kendisi dahil)"""
+    def __init__(self, cats):
+        self.source = cats
+        parents = {c['id']: c['parent_id'][0] if c['parent_id'] else None for c in cats}
+        names = {c['id']: c['name'] for c in cats}
+        self.ancestors, self.descendants, self.paths = {}, {cid: {cid} for cid in parents}, {}
+        for cid in parents:
+            chain, p = [], cid
+            while p in parents and p not in chain: chain.append(p); p = parents[p]
+            self.ancestors[cid] = frozenset(chain)
+            self.paths[cid] = ' / '.join(names[a] for a in reversed(chain))
+            for a in chain: self.descendants[a].add(cid)
+        self.descendants = {cid: frozenset(ids) for cid, ids in self.descendants.items()}
+        self.tree = build_tree([dict(c, path=self.paths[c['id']]) for c in cats])
+
+    def subtree(self, categ_id):
+        """Kategori ve tüm alt kategorilerinin id kümesi; bilinmeyen kategori yalnız kendisini içerir"""
+        return self.descendants.get(categ_id, frozenset([categ_id]))
+
+_category_indexes = {}
+
+def get_category_index(models, db, uid, pwd):
+    # İndeks, önbellekteki kategori listesi yenilendiğinde bir kez yeniden kurulur
+    cats = ref_cache.get(models.url, db, 'categories', lambda: load_categories(models, db, uid, pwd))
+    index = _category_indexes.get((models.url, db))
+    if index is None or index.source is not cats:
+        index = _category_indexes[(models.url, db)] = CategoryIndex(cats)
+    return index
+
+def fetch_products(models, db, uid, pwd, fields=None):
+    # 2. Ürünler (Limit 1000) - Kurulu ölçüler + KDV bilgisi dahil
+    return models.execute_kw(db, uid, pwd, 'product.product', 'search_read', [[['sale_ok','=',True]]], 
+        {'fields': product_source_fields(fields), 'limit': 1000})
+
+PRODUCT_FIELDS = ['id', 'display_name', 'default_code', 'list_price', 'categ_id', 'image_128', 
+                  'x_assembled_width', 'x_assembled_depth', 'x_assembled_height', 'qty_available', 'taxes_id']
+
+# Panel ürün alanı -> Odoo'dan okunması gereken alanlar; istenmeyen ağır alanlar (görsel, ölçüler) okunmaz
+PRODUCT_FIELD_SOURCES = {'image_url': ['image_128'], 'tax_rate': ['taxes_id'], 'qty_available': ['qty_available'],
+                         'x_assembled_width': ['x_assembled_width'], 'x_assembled_depth': ['x_assembled_depth'],
+                         'x_assembled_height': ['x_assembled_height']}
+
+def product_source_fields(fields=None):
+    if not fields: return PRODUCT_FIELDS
+    return ['id', 'display_name', 'default_code', 'list_price', 'categ_id'] + [f for name in fields for f in PRODUCT_FIELD_SOURCES.get(name, [])]
+
+def fetch_taxes(models, db, uid, pwd, products_future):
+    prods = products_future.result()
+    # Tüm unique tax ID'leri topla (PERFORMANS İÇİN BATCH)
+    all_tax_ids = set()
+    for p in prods:
+        if p.get('taxes_id'):
+            all_tax_ids.update(p['taxes_id'])
+    
+    if not all_tax_ids: return {}
+    
+    # Vergi oranları referans önbelleğinden gelir
+    return get_tax_rates(models, db, uid, pwd, all_tax_ids)
+
+def format_products(url, db, prods, tax_rates):
+    # Ürünlere KDV oranını ata
+    products = []
+    for p in prods:
+        tax_rate = 0
+        if p.get('taxes_id') and p['taxes_id']:
+            # İlk verginin oranını al
+            tax_rate = tax_rates.get(p['taxes_id'][0], 0)
         
-        # 6. Faturalar
-        invoices = []
+        products.append({
+            'id': p['id'], 
+            'name': p['display_name'], 
+            'default_code': p['default_code'] or '', 
+            'list_price': p['list_price'], 
+            'image_url': image_url(p['id'], store_image(url, db, p['id'], p['image_128'])) if 'image_128' in p else None, 
+            'categ_id': p['categ_id'][0] if p['categ_id'] else None,
+            'categ_path': p['categ_id'][1] if p['categ_id'] else '',
+            'x_assembled_width': p.get('x_assembled_width', ''), 
+            'x_assembled_depth': p.get('x_assembled_depth', ''),
+            'x_assembled_height': p.get('x_assembled_height', ''),
+            'qty_available': p.get('qty_available', 0),
+            'tax_rate': tax_rate  # KDV oranı (örn: 20, 10, 8)
+        })
+    return products
+
+def fetch_orders(models, db, uid, pwd):
+    # 3. Siparişler (Limit 100) - Teklifler (draft) dahil
+    orders = models.execute_kw(db, uid, pwd, 'sale.order', 'search_read', [], 
+        {'fields': ORDER_FIELDS, 'limit': 100, 'order': 'date_order desc'})
+    return format_orders(orders)
+
+ORDER_FIELDS = ['id', 'name', 'partner_id', 'date_order', 'amount_total', 'state', 'client_order_ref']
+
+def format_orders(orders):
+    return [{'id_raw': o['id'], 'name': o['name'], 'customer': o['partner_id'][1], 
+             'date': o['date_order'], 'amount': o['amount_total'], 'status': o['state'],
+             'quote_code': o.get('client_order_ref', '')} for o in orders]
+
+def fetch_customers(models, db, uid, pwd):
+    # 4. Kontaklar
+    partners_raw = models.execute_kw(db, uid, pwd, 'res.partner', 'search_read', [], {'fields': ['id', 'name', 'phone', 'email', 'total_due', 'is_company'], 'limit': 50})
+    # Not: total_due yoksa 0 ata
+    return [{'id': p['id'], 'name': p['name'], 'phone': p['phone'] or '', 'email': p['email'] or '', 'balance': p.get('total_due', 0), 'type': 'company' if p['is_company'] else 'individual'} for p in partners_raw]
+
+def fetch_tickets(models, db, uid, pwd):
+    # 5. Helpdesk
+    raw_t = models.execute_kw(db, uid, pwd, 'helpdesk.ticket', 'search_read', [], {'fields': TICKET_FIELDS, 'limit': 50})
+    return format_tickets(raw_t)
+
+TICKET_FIELDS = ['id', 'name', 'partner_id', 'stage_id', 'description']
+
+def format_tickets(raw_t):
+    return [{'id': t['id'], 'product': t['name'], 'customer': t['partner_id'][1] if t['partner_id'] else '-', 'issue': t['description'] or '-', 'status': 'new'} for t in raw_t]
+
+def fetch_invoices(models, db, uid, pwd):
+    # 6. Faturalar
+    raw_invoices = models.execute_kw(db, uid, pwd, 'account.move', 'search_read', [INVOICE_DOMAIN], {'fields': INVOICE_FIELDS, 'limit': 20})
+    return format_invoices(raw_invoices)
+
+INVOICE_DOMAIN = [['move_type', 'in', ['out_invoice', 'in_invoice']]]
+INVOICE_FIELDS = ['name', 'partner_id', 'invoice_date', 'amount_total', 'state', 'payment_state', 'move_type']
+
+def format_invoices(raw_invoices):
+    return [{'id': i['name'], 'partner': i['partner_id'][1] if i['partner_id'] else '-', 'date': i['invoice_date'], 'amount': i['amount_total'], 'status': i['state'], 'payment_state': i['payment_state'], 'type': i['move_type']} for i in raw_invoices]
+
+def run_sections(jobs, deadlines=SECTION_DEADLINES):
+    """Bölümleri paralel çalıştırır; {bölüm: sonuç} ve {bölüm: durum} döner.
+    jobs: {bölüm: (fonksiyon, argümanlar)}. Süresi dolan veya hata veren bölümün sonucu None olur."""
+    started = time.time()
+    futures = {}
+    for name, (fn, args) in jobs.items():
+        # Bağımlı bölümler, daha önce gönderilen bölümün future'ını argüman olarak alır
+        args = tuple(futures[a[1:]] if isinstance(a, str) and a.startswith('@') else a for a in args)
+        futures[name] = submit_traced(fn, *args)
+    results, status = {}, {}
+    for name, fut in futures.items():
+        remaining = max(0.0, deadlines.get(name, 10) - (time.time() - started))
         try:
-             raw_invoices = models.execute_kw(db, uid, pwd, 'account.move', 'search_read', [[['move_type', 'in', ['out_invoice', 'in_invoice']]]], {'fields': ['name', 'partner_id', 'invoice_date', 'amount_total', 'state', 'payment_state', 'move_type'], 'limit': 20})
-             invoices = [{'id': i['name'], 'partner': i['partner_id'][1], 'date': i['invoice_date'], 'amount': i['amount_total'], 'status': i['state'], 'payment_state': i['payment_state'], 'type': i['move_type']} for i in raw_invoices]
-        except: pass
+            results[name] = fut.result(timeout=remaining)
+            status[name] = {'status': 'ok'}
+        except FuturesTimeout:
+            results[name] = None
+            status[name] = {'status': 'timeout'}
+        except Exception as e:
+            results[name] = None
+            status[name] = {'status': 'error', 'message': str(e)}
+        status[name]['ms'] = int((time.time() - started) * 1000)
+    return results, status
+
+DASHBOARD_SECTIONS = ('categories', 'products', 'orders', 'customers', 'tickets', 'invoices')
+
+def build_dashboard(url, db, uid, pwd, sections=DASHBOARD_SECTIONS, fields=None):
+    """Dashboard verisini Odoo'dan paralel bölümlerle oluşturur; sadece istenen bölümler çekilir"""
+    models = get_models(url)
+    conn = (models, db, uid, pwd)
+    fields = fields or {}
+
+    jobs = {
+        'categories': (fetch_categories, conn),
+        'products': (fetch_products, conn + (fields.get('products'),)),
+        'taxes': (fetch_taxes, conn + ('@products',)),
+        'orders': (fetch_orders, conn),
+        'customers': (fetch_customers, conn),
+        'tickets': (fetch_tickets, conn),
+        'invoices': (fetch_invoices, conn),
+    }
+    # Vergi bölümü sadece ürünlerin KDV oranı gerekiyorsa çalışır
+    needs_taxes = 'products' in sections and (not fields.get('products') or 'tax_rate' in fields['products'])
+    results, status = run_sections({name: job for name, job in jobs.items() if name in sections or (name == 'taxes' and needs_taxes)})
+    payload = {name: results[name] or [] for name in sections}
+    if 'products' in sections:
+        # Vergiler gelmezse KDV oranı 0 kalır (eski davranış)
+        payload['products'] = format_products(url, db, payload['products'], results.get('taxes') or {})
+    return dict(select_sections(payload, sections, fields), sections=status)
+
+def select_sections(payload, sections, fields=None):
+    """Görüntüden istenen bölümleri alır; fields ile her bölümün kayıtları verilen alanlara indirgenir"""
+    fields = fields or {}
+    project = lambda rows, keep: [{k: r[k] for k in keep if k in r} for r in rows] if keep else rows
+    return {name: project(payload.get(name) or [], fields.get(name)) for name in sections}
+
+def parse_sections(d):
+    """İstekteki sections/fields seçicilerini doğrular; seçici yoksa tüm bölümler döner"""
+    sections = d.get('sections') or DASHBOARD_SECTIONS
+    unknown = [s for s in sections if s not in DASHBOARD_SECTIONS]
+    if unknown: raise ValueError(f"Bilinmeyen bölüm: {', '.join(unknown)}")
+    fields = d.get('fields') or {}
+    if not isinstance(fields, dict) or not all(isinstance(v, list) for v in fields.values()):
+        raise ValueError('fields, {bölüm: [alan, ...]} biçiminde olmalı')
+    return tuple(s for s in DASHBOARD_SECTIONS if s in sections), fields
+
+# ========== Dashboard Anlık Görüntüsü ==========
+# Her kullanıcı (url, db, username) için dashboard arka planda periyodik olarak yeniden oluşturulur; görüntü o kullanıcının
+# Odoo yetkileriyle (kayıt kuralları) oluşturulur ve başka kullanıcıya verilmez. İstekler son görüntüyü hemen alır;
+# görüntü SNAPSHOT_MAX_AGE'den eskiyse arka planda yenilenir (stale-while-revalidate), SNAPSHOT_MAX_STALE'den
+# eskiyse veya hiç yoksa istek yeni görüntüyü bekler. Zamanlayıcı sadece son SNAPSHOT_ACTIVE_FOR saniyede istenen
+# görüntüleri yeniler; uzun süre istenmeyen veritabanı bir sonraki istekte yenilenir.
+SNAPSHOT_ENABLED = os.environ.get('SNAPSHOT_ENABLED', '1') == '1'
+SNAPSHOT_INTERVAL = float(os.environ.get('SNAPSHOT_INTERVAL', 60))
+SNAPSHOT_MAX_AGE = float(os.environ.get('SNAPSHOT_MAX_AGE', 60))
+SNAPSHOT_MAX_STALE = float(os.environ.get('SNAPSHOT_MAX_STALE', 3600))
+SNAPSHOT_ACTIVE_FOR = float(os.environ.get('SNAPSHOT_ACTIVE_FOR', 5 * SNAPSHOT_MAX_AGE))
+SNAPSHOT_FORGET_AFTER = float(os.environ.get('SNAPSHOT_FORGET_AFTER', 7 * 86400))
+
+class DashboardSnapshot:
+    """Bir veritabanının son dashboard görüntüsü ve oluşturma istatistikleri"""
+    def __init__(self, creds):
+        self.creds = creds
+        self.payload = None
+        self.built_at = 0
+        self.build_ms = None
+        self.builds = self.failures = 0
+        self.last_error = None
+        self.last_request = time.time()
+        self._build_lock = threading.Lock()
+
+    @property
+    def age(self): return time.time() - self.built_at if self.payload else None
+
+    def build(self, wait=True):
+        """Görüntüyü yeniden oluşturur; wait=False iken devam eden bir oluşturma varsa hemen döner"""
+        if not self._build_lock.acquire(blocking=wait): return
+        try:
+            # Beklerken başka bir istek görüntüyü yenilediyse tekrar oluşturma
+            if wait and self.payload and self.age < SNAPSHOT_MAX_AGE: return
+            started = time.time()
+            url, uid, _ = get_conn(self.creds)
+            if not uid: raise Exception('Giriş başarısız')
+            self.payload = build_dashboard(url, self.creds['db'], uid, self.creds['password'])
+            self.built_at = time.time()
+            self.build_ms = int((self.built_at - started) * 1000)
+            self.builds += 1
+            self.last_error = None
+        except Exception as e:
+            self.failures += 1
+            self.last_error = str(e)
+            if wait and not self.payload: raise
+        finally:
+            self._build_lock.release()
 
-        return jsonify({'categories': categories, 'products': products, 'customers': customers, 'orders': clean_orders, 'tickets': tickets, 'invoices': invoices})
+    def refresh_async(self):
+        threading.Thread(target=self.build, kwargs={'wait': False}, daemon=True, name='dashboard-snapshot').start()
+
+    def stats(self):
+        return {'age': round(self.age, 1) if self.payload else None, 'build_ms': self.build_ms, 'builds': self.builds,
+                'failures': self.failures, 'last_error': self.last_error, 'building': self._build_lock.locked()}
+
+_snapshots = {}  # (url, db, username) -> DashboardSnapshot
+_snapshots_lock = threading.Lock()
+_scheduler_started = False
+
+def _snapshot_loop():
+    while True:
+        time.sleep(SNAPSHOT_INTERVAL)
+        with _snapshots_lock:
+            for key in [k for k, snap in _snapshots.items() if time.time() - snap.last_request > SNAPSHOT_FORGET_AFTER]: del _snapshots[key]
+            snaps = [snap for snap in _snapshots.values() if time.time() - snap.last_request <= SNAPSHOT_ACTIVE_FOR]
+        for snap in snaps:
+            if snap.age is None or snap.age >= SNAPSHOT_INTERVAL: snap.build(wait=False)
+
+def get_snapshot(url, creds):
+    """Kullanıcının görüntüsünü döner; zamanlayıcıyı ilk kullanımda başlatır"""
+    global _scheduler_started
+    key = (url, creds['db'], creds['username'])
+    with _snapshots_lock:
+        snap = _snapshots.get(key)
+        if snap is None: snap = _snapshots[key] = DashboardSnapshot(creds)
+        snap.creds, snap.last_request = creds, time.time()  # Arka plan yenilemesi son geçerli bilgilerle yapılır
+        if not _scheduler_started:
+            threading.Thread(target=_snapshot_loop, daemon=True, name='dashboard-scheduler').start()
+            _scheduler_started = True
+    return snap
+
+@app.route('/api/dashboard-data', methods=['POST'])
+@coalesced
+def data():
+    """Dashboard verisi; sections ile sadece istenen sekmelerin bölümleri, fields ile sadece gereken alanlar döner"""
+    d = request.json
+    try:
+        url, uid, _ = get_conn(d)
+        if not uid: return jsonify({"error": "Giriş başarısız"})
+        sections, fields = parse_sections(d)
+        if not SNAPSHOT_ENABLED:
+            return compact_response(build_dashboard(url, d.get('db'), uid, d.get('password'), sections, fields), volatile=('sections',))
+
+        snap = get_snapshot(url, {'url': url, 'db': d.get('db'), 'username': d.get('username'), 'password': d.get('password')})
+        if snap.payload is None and sections != DASHBOARD_SECTIONS:
+            # Soğuk başlangıçta istenen bölümler hemen çekilir, tam görüntü arka planda hazırlanır
+            snap.refresh_async()
+            return compact_response(build_dashboard(url, d.get('db'), uid, d.get('password'), sections, fields), volatile=('sections',))
+        if snap.payload is None or snap.age > SNAPSHOT_MAX_STALE: snap.build()
+        elif snap.age > SNAPSHOT_MAX_AGE: snap.refresh_async()
+        status = {name: s for name, s in snap.payload['sections'].items() if name in sections or (name == 'taxes' and 'products' in sections)}
+        return compact_response(dict(select_sections(snap.payload, sections, fields), sections=status,
+                                     snapshot={'age': round(snap.age, 1), 'build_ms': snap.build_ms}),
+                                volatile=('sections', 'snapshot'))
     except Exception as e: return jsonify({"error": str(e)})
 
+@app.route('/api/snapshot-stats', methods=['GET'])
+@ops_only
+def snapshot_stats():
+    """Dashboard görüntülerinin yaşı, oluşturma süresi ve hata sayıları"""
+    with _snapshots_lock:
+        return jsonify({'status': 'success', 'snapshots': {'|'.join(key): snap.stats() for key, snap in _snapshots.items()}})
+
+# ========== Yerel Ürün Kataloğu ==========
+# Satılabilir ürünlerin bellekteki kopyası; ilk seferde tam yüklenir, sonra write_date ile artımlı güncellenir.
+# Arama, ad ve ürün kodu üzerindeki 1-3 harflik n-gram indeksinde yapılır; her tuşa basışta Odoo'ya gidilmez.
+CATALOG_FIELDS = ['id', 'name', 'display_name', 'default_code', 'list_price', 'categ_id', 'image_128', 
+                  'x_assembled_width', 'x_assembled_depth', 'x_assembled_height', 'qty_available', 'taxes_id',
+                  'sale_ok', 'active', 'write_date']
+CATALOG_SYNC_INTERVAL = float(os.environ.get('CATALOG_SYNC_INTERVAL', 30))
+CATALOG_FULL_RESYNC = float(os.environ.get('CATALOG_FULL_RESYNC', 21600))
+CATALOG_BATCH = 500
+
+def normalize_text(text):
+    # İ/I/ı hepsi 'i' olur: Türkçe ve Latin yazımlar (MIRA/mira, KIRMIZI/kırmızı) birbirini bulur; ilike gibi geniş eşleşir
+    return (text or '').replace('İ', 'i').replace('I', 'i').replace('ı', 'i').casefold()
+
+def _ngrams(text):
+    return {text[i:i + n] for n in (1, 2, 3) for i in range(len(text) - n + 1)}
+
+class ProductCatalog:
+    """Bir Odoo veritabanının satılabilir ürünleri ve arama indeksi"""
+    def __init__(self, url, db):
+        self.url, self.db = url, db
+        self.records = {}   # id -> ürün kaydı (tax_rate eklenmiş)
+        self.keys = {}      # id -> (normalize ad, normalize kod)
+        self.index = {}     # n-gram -> {id, ...}
+        self.tax_rates = {}
+        self.last_write_date = None
+        self.last_sync = self.last_full_sync = 0
+        self._lock = threading.RLock()
+        self._sync_lock = threading.Lock()
+        self._syncing = False
+
+    @property
+    def loaded(self): return self.last_full_sync > 0
+
+    def _unindex(self, pid):
+        for g in _ngrams(' '.join(self.keys.pop(pid, ('', '')))): 
+            ids = self.index.get(g)
+            if ids: ids.discard(pid)
+
+    def _put(self, p):
+        pid = p['id']
+        self._unindex(pid)
+        if not p.get('sale_ok', True) or not p.get('active', True):
+            self.records.pop(pid, None)
+            return
+        p['tax_rate'] = self.tax_rates.get(p['taxes_id'][0], 0) if p.get('taxes_id') else 0
+        p['categ'] = p['categ_id'][0] if p.get('categ_id') else None
+        # Görsel bellekte tutulmaz, diske yazılıp sadece hash'i saklanır
+        p['image_hash'] = store_image(self.url, self.db, pid, p.pop('image_128', None))
+        self.records[pid] = p
+        self.keys[pid] = (normalize_text(p.get('name')), normalize_text(p.get('default_code') or ''))
+        # Ad ve kod arasındaki boşluk, iki alanı kesen n-gram'ları zararsız kılar; eşleşme search() içinde doğrulanır
+        for g in _ngrams(' '.join(self.keys[pid])): self.index.setdefault(g, set()).add(pid)
+
+    def _load_taxes(self, models, uid, pwd, rows):
+        missing = {t for p in rows for t in (p.get('taxes_id') or []) if t not in self.tax_rates}
+        if not missing: return
+        try: self.tax_rates.update(get_tax_rates(models, self.db, uid, pwd, missing))
+        except: pass
+
+    def _fetch(self, models, uid, pwd, domain):
+        rows, offset = [], 0
+        while True:
+            batch = models.execute_kw(self.db, uid, pwd, 'product.product', 'search_read', [domain],
+                {'fields': CATALOG_FIELDS, 'limit': CATALOG_BATCH, 'offset': offset, 'order': 'id', 'context': {'active_test': False}})
+            rows.extend(batch)
+            if len(batch) < CATALOG_BATCH: return rows
+            offset += CATALOG_BATCH
+
+    def sync(self, models, uid, pwd, full=False):
+        """Tam yükleme veya write_date üzerinden artımlı güncelleme yapar"""
+        # Odoo'dan okuma kilit dışında yapılır; aramalar sadece kayıtlar uygulanırken bekler
+        with self._sync_lock:
+            now = time.time()
+            full = full or not self.loaded or now - self.last_full_sync > CATALOG_FULL_RESYNC
+            if full:
+                rows = self._fetch(models, uid, pwd, [['sale_ok', '=', True], ['active', '=', True]])
+            else:
+                # Aynı saniyede yazılan kayıtlar kaçmasın diye >= kullanılır
+                rows = self._fetch(models, uid, pwd, [['write_date', '>=', self.last_write_date]]) if self.last_write_date else []
+            self._load_taxes(models, uid, pwd, rows)
+            with self._lock:
+                if full:
+                    self.records, self.keys, self.index = {}, {}, {}
+                    self.last_full_sync = now
+                for p in rows:
+                    self._put(p)
+                    if p.get('write_date') and (not self.last_write_date or p['write_date'] > self.last_write_date): self.last_write_date = p['write_date']
+                self.last_sync = now
+
+    def ensure_fresh(self, models, uid, pwd):
+        """İlk yüklemeyi bekler; sonrasında eskiyen katalog arka planda güncellenir"""
+        if not self.loaded:
+            with self._sync_lock: pass  # Eşzamanlı ilk yükleme varsa onu bekle
+            if not self.loaded: return self.sync(models, uid, pwd)
+        if time.time() - self.last_sync < CATALOG_SYNC_INTERVAL: return
+        with self._lock:
+            if self._syncing: return
+            self._syncing = True
+        def run():
+            try: self.sync(models, uid, pwd)
+            except Exception as e: log.error(f"Catalog sync failed: {e}")
+            finally: self._syncing = False
+        _fanout_executor.submit(run)
+
+    def search(self, query, limit=100, categ_ids=None):
+        """categ_ids verilirse sadece bu kategorilerdeki ürünler döner (alt ağaç kümesi)"""
+        q = normalize_text(query).strip()
+        with self._lock:
+            if not q: ids = list(self.records)
+            else:
+                grams = [q] if len(q) <= 3 else [q[i:i + 3] for i in range(len(q) - 2)]
+                postings = sorted((self.index.get(g, set()) for g in grams), key=len)
+                ids = set(postings[0]).intersection(*postings[1:]) if postings else set()
+                if len(q) > 3: ids = [i for i in ids if q in self.keys[i][0] or q in self.keys[i][1]]
+            if categ_ids is not None: ids = [i for i in ids if self.records[i]['categ'] in categ_ids]
+            # Koda veya ada önek olarak uyanlar önce gelsin
+            def rank(i):
+                name, code = self.keys[i]
+                return (not (code.startswith(q) or name.startswith(q)), code, name, i)
+            return [self.records[i] for i in sorted(ids, key=rank)[:limit]]
+
+    def stats(self):
+        return {'products': len(self.records), 'grams': len(self.index), 'last_write_date': self.last_write_date,
+                'last_sync': self.last_sync, 'last_full_sync': self.last_full_sync}
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+def get_catalog(url, db):
+    with _catalogs_lock:
+        if (url, db) not in _catalogs: _catalogs[(url, db)] = ProductCatalog(url, db)
+        return _catalogs[(url, db)]
+
 @app.route('/api/search', methods=['POST'])
+@coalesced
 def search():
     d = request.json
     try:
-        url, uid, _ = get_conn(d)
-        models = xmlrpc.client.ServerProxy(f'{url}/xmlrpc/2/object')
+        url, uid, _ = get_auth_conn(d)
+        models = get_models(url)
         model = d.get('model')
         query = d.get('query')
         
+        # Ürün araması yerel katalogdan yapılır
+        # categ_id verilirse kategori ve tüm alt kategorileri süzülür; sorgusuz aramada kategorinin tamamı döner
+        if model == 'product.product':
+            catalog = get_catalog(url, d.get('db'))
+            catalog.ensure_fresh(models, uid, d.get('password'))
+            categ_ids = get_category_index(models, d.get('db'), uid, d.get('password')).subtree(int(d['categ_id'])) if d.get('categ_id') else None
+            limit = 100 if query else LIST_MAX_PAGE_SIZE
+            data = [{'id': p['id'], 'name': p['display_name'], 'default_code': p['default_code'], 'list_price': p['list_price'], 'image_url': image_url(p['id'], p['image_hash']), 'categ_id': p['categ'], 'categ_path': p['categ_id'][1] if p['categ_id'] else '',
+                     'x_assembled_width': p.get('x_assembled_width', ''), 'x_assembled_depth': p.get('x_assembled_depth', ''), 'x_assembled_height': p.get('x_assembled_height', ''),
+                     'qty_available': p.get('qty_available', 0), 'tax_rate': p['tax_rate']} for p in catalog.search(query, limit, categ_ids)]
+            return jsonify({"status": "success", "data": data})
+
         domain = []
         fields = []
-        if model == 'product.product':
-             domain = ['|', ('name', 'ilike', query), ('default_code', 'ilike', query)]
-             fields = ['id', 'display_name', 'default_code', 'list_price', 'categ_id', 'image_128', 'taxes_id']
-        elif model == 'sale.order':
+        if model == 'sale.order':
              domain = ['|', ('name', 'ilike', query), ('partner_id', 'ilike', query)]
              fields = ['id', 'name', 'partner_id', 'date_order', 'amount_total', 'state']
         elif model == 'res.partner':
@@ -181,27 +1303,7 @@ def search():
         
         # Format
         data = []
-        if model == 'product.product':
-            # Batch tax query (PERFORMANCE)
-            all_tax_ids = set()
-            for p in res:
-                if p.get('taxes_id'):
-                    all_tax_ids.update(p['taxes_id'])
-            
-            tax_rates = {}
-            if all_tax_ids:
-                try:
-                    taxes = models.execute_kw(d.get('db'), uid, d.get('password'), 'account.tax', 'read', [list(all_tax_ids)], {'fields': ['id', 'amount']})
-                    tax_rates = {t['id']: t['amount'] for t in taxes}
-                except:
-                    pass
-            
-            for p in res:
-                tax_rate = 0
-                if p.get('taxes_id') and p['taxes_id']:
-                    tax_rate = tax_rates.get(p['taxes_id'][0], 0)
-                data.append({'id': p['id'], 'name': p['display_name'], 'default_code': p['default_code'], 'list_price': p['list_price'], 'image_128': p['image_128'], 'categ_path': str(p['categ_id']), 'tax_rate': tax_rate})
-        elif model == 'sale.order':
+        if model == 'sale.order':
             data = [{'id_raw': o['id'], 'name': o['name'], 'customer': o['partner_id'][1], 'date': o['date_order'], 'amount': o['amount_total'], 'status': o['state']} for o in res]
         elif model == 'res.partner':
             data = [{'id': p['id'], 'name': p['name'], 'phone': p['phone'], 'email': p['email'], 'balance': p.get('total_due', 0), 'type': 'company' if p['is_company'] else 'individual'} for p in res]
@@ -209,17 +1311,226 @@ def search():
         return jsonify({"status": "success", "data": data})
     except Exception as e: return jsonify({"status": "error", "message": str(e)})
 
+# ========== Sayfalı Listeleme ==========
+# Ürün ve siparişler id üzerinden keyset sayfalama ile çekilir (sabit limitler yüzünden veri kesilmez).
+# stream=true ile her parti NDJSON satırı olarak hemen gönderilir; sunucu belleği katalog boyutundan bağımsızdır.
+LIST_PAGE_SIZE = 200
+LIST_MAX_PAGE_SIZE = 1000
+
+def _list_products(models, db, uid, pwd, url, batch, tax_rates):
+    missing = {t for p in batch for t in (p.get('taxes_id') or []) if t not in tax_rates}
+    if missing:
+        try: tax_rates.update(get_tax_rates(models, db, uid, pwd, missing))
+        except: pass
+    return format_products(url, db, batch, tax_rates)
+
+LISTINGS = {
+    'products': {'model': 'product.product', 'domain': [['sale_ok', '=', True]], 'fields': PRODUCT_FIELDS, 'desc': False,
+                 'format': _list_products},
+    'orders': {'model': 'sale.order', 'domain': [], 'fields': ORDER_FIELDS, 'desc': True,
+               'format': lambda models, db, uid, pwd, url, batch, tax_rates: format_orders(batch)},
+}
+
+def iter_listing(models, db, uid, pwd, url, kind, cursor=None, page_size=LIST_PAGE_SIZE, max_pages=None, extra_domain=()):
+    """(kayıtlar, sonraki_cursor) partileri üretir; cursor son görülen id'dir"""
+    spec = LISTINGS[kind]
+    tax_rates, pages = {}, 0
+    while max_pages is None or pages < max_pages:
+        domain = list(spec['domain']) + list(extra_domain)
+        if cursor: domain.append(['id', '<' if spec['desc'] else '>', cursor])
+        batch = models.execute_kw(db, uid, pwd, spec['model'], 'search_read', [domain],
+            {'fields': spec['fields'], 'limit': page_size, 'order': 'id desc' if spec['desc'] else 'id'})
+        pages += 1
+        cursor = batch[-1]['id'] if len(batch) == page_size else None
+        yield spec['format'](models, db, uid, pwd, url, batch, tax_rates), cursor
+        if not cursor: return
+
+@app.route('/api/list/<kind>', methods=['POST'])
+@coalesced
+def list_records(kind):
+    """Cursor ile sayfalı ürün/sipariş listesi; stream=true ise NDJSON akışı"""
+    d = request.json
+    try:
+        if kind not in LISTINGS: return jsonify({'status': 'error', 'message': 'Bilinmeyen liste'})
+        url, uid, _ = get_conn(d)
+        models = get_models(url)
+        db, pwd = d.get('db'), d.get('password')
+        page_size = max(1, min(int(d.get('limit') or LIST_PAGE_SIZE), LIST_MAX_PAGE_SIZE))
+        cursor = d.get('cursor')
+        # Ürünlerde kategori alt ağacı indeksten çözülür; Odoo'ya child_of yerine düz id listesi gider
+        extra = []
+        if kind == 'products' and d.get('categ_id'):
+            extra = [['categ_id', 'in', sorted(get_category_index(models, db, uid, pwd).subtree(int(d['categ_id'])))]]
+
+        if not d.get('stream'):
+            data, next_cursor = next(iter_listing(models, db, uid, pwd, url, kind, cursor, page_size, max_pages=1, extra_domain=extra))
+            return jsonify({'status': 'success', 'data': data, 'next_cursor': next_cursor})
+
+        def generate():
+            try:
+                for data, next_cursor in iter_listing(models, db, uid, pwd, url, kind, cursor, page_size, extra_domain=extra):
+                    yield json.dumps({'data': data, 'next_cursor': next_cursor}) + '\n'
+                yield json.dumps({'done': True}) + '\n'
+            except Exception as e:
+                # Akış başladıktan sonra hata, son satırda bildirilir
+                yield json.dumps({'status': 'error', 'message': str(e)}) + '\n'
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson', headers={'X-Accel-Buffering': 'no'})
+    except Exception as e: return jsonify({'status': 'error', 'message': str(e)})
+
+# ========== Değişiklik Akışı ==========
+# İstemci son senkron anahtarını (token) gönderir, sadece o andan sonra oluşturulan/değişen kayıtlar döner.
+# Anahtar her model için son görülen write_date ve o saniyede görülen id'leri taşır; aynı saniyede yazılan
+# kayıtlar kaçmaz ve tekrar gönderilmez. Kapsam dışına çıkan (arşivlenen, satıştan kaldırılan) kayıtlar
+# 'removed' ile bildirilir; Odoo'da tamamen silinen kayıtlar write_date ile görülemez. Stok hareketleri ürünün write_date'ini
+# değiştirmez; bu yüzden 'stock' akışı stock.quant write_date'ini izler ve ürünlerin güncel qty_available'ını 'products'
+# bölümüne yazar. Sayımla tamamen silinen (sıfırlanıp temizlenen) quant'lar bu akışta görülmez.
+CHANGES_LIMIT = 500
+CHANGES_POLL_INTERVAL = float(os.environ.get('CHANGES_POLL_INTERVAL', 5))
+CHANGES_STREAM_MAX = float(os.environ.get('CHANGES_STREAM_MAX', 300))
+
+def _product_changes(models, db, uid, pwd, url, rows):
+    tax_ids = {t for p in rows for t in (p.get('taxes_id') or [])}
+    return format_products(url, db, rows, get_tax_rates(models, db, uid, pwd, tax_ids) if tax_ids else {})
+
+def _stock_changes(models, db, uid, pwd, url, rows):
+    """Değişen quant'ların ürünleri için {id, qty_available}; istemci bunları ürün satırlarına birleştirir"""
+    product_ids = list({r['product_id'][0] for r in rows if r['product_id']})
+    if not product_ids: return []
+    return models.execute_kw(db, uid, pwd, 'product.product', 'read', [product_ids], {'fields': ['qty_available']})
+
+# 'section' verilen akışın sonucu o bölüme eklenir; 'stock' 'products'tan önce gelir ki aynı üründe tam satır son kalsın
+CHANGE_FEEDS = {
+    'orders': {'model': 'sale.order', 'fields': ORDER_FIELDS,
+               'format': lambda models, db, uid, pwd, url, rows: format_orders(rows)},
+    'stock': {'model': 'stock.quant', 'fields': ['product_id'], 'domain': [['location_id.usage', '=', 'internal']],
+              'section': 'products', 'format': _stock_changes},
+    'products': {'model': 'product.product', 'fields': PRODUCT_FIELDS + ['sale_ok', 'active'],
+                 'scope': lambda r: r['sale_ok'] and r['active'], 'format': _product_changes},
+    'tickets': {'model': 'helpdesk.ticket', 'fields': TICKET_FIELDS,
+                'format': lambda models, db, uid, pwd, url, rows: format_tickets(rows)},
+    'invoices': {'model': 'account.move', 'fields': INVOICE_FIELDS, 'domain': INVOICE_DOMAIN,
+                 'format': lambda models, db, uid, pwd, url, rows: format_invoices(rows)},
+}
+
+def encode_sync_token(cursors):
+    return base64.urlsafe_b64encode(json.dumps(cursors, separators=(',', ':')).encode()).decode().rstrip('=')
+
+def decode_sync_token(token):
+    try:
+        cursors = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        if isinstance(cursors, dict) and all(name in CHANGE_FEEDS and isinstance(c, list) and len(c) == 2 for name, c in cursors.items()):
+            return cursors
+    except Exception: pass
+    raise ValueError('Geçersiz senkron anahtarı')
+
+def feed_head(models, db, uid, pwd, name):
+    """Akışın şu anki son write_date'i; ilk senkronda başlangıç noktası olur"""
+    spec = CHANGE_FEEDS[name]
+    rows = models.execute_kw(db, uid, pwd, spec['model'], 'search_read', [spec.get('domain', [])],
+        {'fields': ['write_date'], 'limit': 50, 'order': 'write_date desc, id desc', 'context': {'active_test': False}})
+    if not rows: return [None, []]
+    return [rows[0]['write_date'], [r['id'] for r in rows if r['write_date'] == rows[0]['write_date']]]
+
+def poll_feed(models, db, uid, pwd, url, name, cursor):
+    """cursor'dan sonraki değişiklikleri {changed, removed, cursor, more} olarak döner"""
+    spec = CHANGE_FEEDS[name]
+    since, seen = cursor
+    domain = list(spec.get('domain', [])) + ([['write_date', '>=', since]] if since else [])
+    rows = models.execute_kw(db, uid, pwd, spec['model'], 'search_read', [domain],
+        {'fields': spec['fields'] + ['write_date'], 'limit': CHANGES_LIMIT + len(seen), 'order': 'write_date, id', 'context': {'active_test': False}})
+    rows = [r for r in rows if not (r['write_date'] == since and r['id'] in seen)][:CHANGES_LIMIT]
+    if rows:
+        last = rows[-1]['write_date']
+        cursor = [last, [r['id'] for r in rows if r['write_date'] == last] + (seen if last == since else [])]
+    scope = spec.get('scope', lambda r: True)
+    changed = spec['format'](models, db, uid, pwd, url, [r for r in rows if scope(r)])
+    removed = [r['id'] for r in rows if not scope(r)]
+    return {'changed': changed, 'removed': removed, 'cursor': cursor, 'more': len(rows) == CHANGES_LIMIT}
+
+def collect_changes(url, db, uid, pwd, token=None, feeds=CHANGE_FEEDS):
+    """Tüm akışları paralel sorgular; hata veren akışın anahtarı ilerlemez"""
+    models = get_models(url)
+    conn = (models, db, uid, pwd)
+    cursors = decode_sync_token(token) if token else {}
+    jobs = {name: (poll_feed, conn + (url, name, cursors[name])) if name in cursors else (feed_head, conn + (name,)) for name in feeds}
+    results, status = run_sections(jobs)
+    out = {}
+    for name in feeds:
+        result = results[name]
+        if result is None: continue
+        if name not in cursors: cursors[name] = result
+        else:
+            cursors[name] = result['cursor']
+            if result['changed'] or result['removed']:
+                section = out.setdefault(CHANGE_FEEDS[name].get('section', name), {'changed': [], 'removed': [], 'more': False})
+                section['changed'] += result['changed']
+                section['removed'] += result['removed']
+                section['more'] = section['more'] or result['more']
+    return {'status': 'success', 'token': encode_sync_token(cursors), 'changes': out,
+            'more': any(c['more'] for c in out.values()), 'sections': {n: s for n, s in status.items() if s['status'] != 'ok'}}
+
+@app.route('/api/changes', methods=['POST'])
+@coalesced
+def changes():
+    """since anahtarından sonraki değişiklikler; anahtarsız ilk çağrı sadece başlangıç anahtarını döner"""
+    d = request.json
+    try:
+        url, uid, _ = get_conn(d)
+        if not uid: return jsonify({'status': 'error', 'message': 'Giriş başarısız'})
+        feeds = [f for f in (d.get('feeds') or CHANGE_FEEDS) if f in CHANGE_FEEDS]
+        return jsonify(collect_changes(url, d.get('db'), uid, d.get('password'), d.get('since') or request.args.get('since'), feeds))
+    except Exception as e: return jsonify({'status': 'error', 'message': str(e)})
+
+@app.route('/api/changes/stream', methods=['GET'])
+def changes_stream():
+    """Server-sent events: değişiklik oldukça 'changes' olayı gönderilir. EventSource gövde gönderemediği için
+    oturum çerezden okunur; bağlantı CHANGES_STREAM_MAX saniye sonra kapanır, tarayıcı Last-Event-ID ile yeniden bağlanır."""
+    creds = get_session(request.cookies.get('panel_session'))
+    if not creds: return jsonify({'status': 'error', 'message': 'Oturum süresi doldu'}), 401
+    token = request.headers.get('Last-Event-ID') or request.args.get('since')
+    try:
+        url, uid, _ = get_conn(creds)
+        if token: decode_sync_token(token)
+    except Exception as e: return jsonify({'status': 'error', 'message': str(e)}), 400
+
+    def generate():
+        nonlocal token
+        deadline = time.time() + CHANGES_STREAM_MAX
+        yield 'retry: 5000\n\n'
+        while time.time() < deadline:
+            try:
+                result = collect_changes(url, creds['db'], uid, creds['password'], token)
+                first, token = token is None, result['token']
+                if first or result['changes']:
+                    yield f"id: {token}\nevent: changes\ndata: {json.dumps(result)}\n\n"
+                    if result['more']: continue
+                else: yield ': ping\n\n'  # Proxy'ler boşta kalan bağlantıyı kapatmasın
+            except Exception as e:
+                yield f"event: error\ndata: {json.dumps({'message': str(e)})}\n\n"
+            time.sleep(CHANGES_POLL_INTERVAL)
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+ORDER_DETAILS_MAX = 200
+
+def format_order_line(l): return {'name': l['name'], 'qty': l['product_uom_qty'], 'price': l['price_unit'], 'total': l['price_subtotal']}
+
 @app.route('/api/order-details', methods=['POST'])
+@coalesced
 def order_details():
+    """Sipariş satırları; order_ids ile birden çok siparişin satırları tek search_read ile gelir"""
     d = request.json
     try:
         url, uid, _ = get_conn(d)
-        models = xmlrpc.client.ServerProxy(f'{url}/xmlrpc/2/object')
-        order = models.execute_kw(d.get('db'), uid, d.get('password'), 'sale.order', 'read', [[d.get('order_id')]], {'fields': ['order_line']})
-        if not order: return jsonify({'lines': []})
-        line_ids = order[0]['order_line']
-        lines = models.execute_kw(d.get('db'), uid, d.get('password'), 'sale.order.line', 'read', [line_ids], {'fields': ['name', 'product_uom_qty', 'price_unit', 'price_subtotal']})
-        return jsonify({'lines': [{'name': l['name'], 'qty': l['product_uom_qty'], 'price': l['price_unit'], 'total': l['price_subtotal']} for l in lines]})
+        models = get_models(url)
+        order_ids = [int(i) for i in (d.get('order_ids') or [d.get('order_id')]) if i]
+        if len(order_ids) > ORDER_DETAILS_MAX: return jsonify({"error": f'En fazla {ORDER_DETAILS_MAX} sipariş istenebilir'})
+        lines = models.execute_kw(d.get('db'), uid, d.get('password'), 'sale.order.line', 'search_read', [[['order_id', 'in', order_ids]]],
+            {'fields': ['order_id', 'name', 'product_uom_qty', 'price_unit', 'price_subtotal'], 'order': 'order_id, sequence, id'}) if order_ids else []
+        grouped = {oid: [] for oid in order_ids}
+        for l in lines: grouped[l['order_id'][0]].append(format_order_line(l))
+        if 'order_ids' not in d: return jsonify({'lines': grouped[order_ids[0]] if order_ids else []})
+        return jsonify({'orders': {str(oid): ls for oid, ls in grouped.items()}})
     except Exception as e: return jsonify({"error": str(e)})
 
 @app.route('/api/create-quote', methods=['POST'])
@@ -228,7 +1539,7 @@ def create_quote():
     d = request.json
     try:
         url, uid, _ = get_conn(d)
-        models = xmlrpc.client.ServerProxy(f'{url}/xmlrpc/2/object')
+        models = get_models(url)
         db, pwd = d.get('db'), d.get('password')
         
         # Teklif kodu unique olmalı
@@ -237,93 +1548,67 @@ def create_quote():
         customer_phone = d.get('customer_phone', '')
         items = d.get('items', [])
         
-        # Önce partner oluştur veya bul (eğer telefon varsa)
-        partner_id = False
-        partner_tag = None
-        
-        # "Mağaza Ziyaretçisi Panel" etiketini bul veya oluştur
-        try:
-            tag_search = models.execute_kw(db, uid, pwd, 'res.partner.category', 'search_read',
-                [[['name', '=', 'Mağaza Ziyaretçisi Panel']]], {'fields': ['id'], 'limit': 1})
-            if tag_search:
-                partner_tag = tag_search[0]['id']
-            else:
-                partner_tag = models.execute_kw(db, uid, pwd, 'res.partner.category', 'create', [{
-                    'name': 'Mağaza Ziyaretçisi Panel'
-                }])
-        except:
-            partner_tag = None  # Etiket oluşturulamazsa devam et
-        
-        if customer_phone:
-            # Telefon ile mevcut partner ara
-            partners = models.execute_kw(db, uid, pwd, 'res.partner', 'search_read', 
-                [[['phone', '=', customer_phone]]], {'fields': ['id'], 'limit': 1})
-            if partners:
-                partner_id = partners[0]['id']
-                # Mevcut müşteriye de etiketi ekle
-                if partner_tag:
-                    try:
-                        models.execute_kw(db, uid, pwd, 'res.partner', 'write', [[partner_id], {
-                            'category_id': [(4, partner_tag)]  # Many2many add
-                        }])
-                    except:
-                        pass
-            else:
-                # Yeni partner oluştur
-                partner_data = {
-                    'name': customer_name,
-                    'phone': customer_phone,
-                    'customer_rank': 1
-                }
-                if partner_tag:
-                    partner_data['category_id'] = [(4, partner_tag)]
-                partner_id = models.execute_kw(db, uid, pwd, 'res.partner', 'create', [partner_data])
-        else:
-            # Genel "Mağaza Ziyaretçisi" partner'ı kullan veya oluştur
-            partners = models.execute_kw(db, uid, pwd, 'res.partner', 'search_read',
-                [[['name', '=', 'Mağaza Ziyaretçisi']]], {'fields': ['id'], 'limit': 1})
-            if partners:
-                partner_id = partners[0]['id']
-            else:
-                partner_data = {
-                    'name': 'Mağaza Ziyaretçisi',
-                    'customer_rank': 1
-                }
-                if partner_tag:
-                    partner_data['category_id'] = [(4, partner_tag)]
-                partner_id = models.execute_kw(db, uid, pwd, 'res.partner', 'create', [partner_data])
-        
-        # Satış siparişi oluştur
-        order_lines = []
-        for item in items:
-            order_lines.append((0, 0, {
-                'product_id': item['id'],
-                'product_uom_qty': item['qty'],
-                'price_unit': item['list_price']
-            }))
-        
-        order_id = models.execute_kw(db, uid, pwd, 'sale.order', 'create', [{
-            'partner_id': partner_id,
-            'client_order_ref': quote_code,  # Unique teklif kodu
-            'note': f'Web panelinden oluşturuldu. Müşteri: {customer_name}',
-            'order_line': order_lines,
-            'state': 'draft'  # Teklif olarak
-        }])
-        
-        # Cache'e kaydet (web sorgulaması için)
-        if CACHE_ENABLED:
+        # Tekrar gönderim anahtarı: istemci her "Teklif Oluştur" tıklamasında bir kez üretir; eski istemciler için teklif kodu
+        idem_key = d.get('idempotency_key') or quote_code
+        if not IDEMPOTENCY_KEY_RE.match(str(idem_key)): return jsonify({'status': 'error', 'message': 'Geçersiz idempotency_key'}), 400
+        fingerprint = quote_fingerprint(customer_name, customer_phone, items)
+        with quote_lock(url, db, idem_key):
+            # Aynı gönderim tekrar geldiyse (zaman aşımı sonrası yeniden deneme) mevcut siparişi döndür
+            existing = find_quote_order(models, url, db, uid, pwd, idem_key, quote_code)
+            if existing:
+                if existing.get('pending'): return jsonify({'status': 'error', 'message': 'Teklif işleniyor, lütfen bekleyin'}), 409
+                if existing['fingerprint'] not in (fingerprint, None):
+                    return jsonify({'status': 'error', 'message': f'Bu gönderim anahtarı farklı bir teklifte kullanılmış: {idem_key}'}), 409
+                return jsonify({
+                    'status': 'success',
+                    'order_id': existing['order_id'],
+                    'quote_code': quote_code,
+                    'duplicate': True,
+                    'message': f'Teklif zaten oluşturulmuş: {quote_code}'
+                })
+            if not claim_quote_order(url, db, idem_key, fingerprint):
+                return jsonify({'status': 'error', 'message': 'Teklif işleniyor, lütfen bekleyin'}), 409
+
             try:
-                quote_data = {
-                    'code': quote_code,
-                    'customer_name': customer_name,
-                    'customer_phone': customer_phone,
-                    'odoo_order_id': order_id,
-                    'items': items,
-                    'created_at': datetime.now().isoformat()
+                # Satış siparişi oluştur
+                order_lines = []
+                for item in items:
+                    order_lines.append((0, 0, {
+                        'product_id': item['id'],
+                        'product_uom_qty': item['qty'],
+                        'price_unit': item['list_price']
+                    }))
+                
+                order_data = {
+                    'client_order_ref': quote_code,  # Unique teklif kodu
+                    'note': f'Web panelinden oluşturuldu. Müşteri: {customer_name} {quote_order_tag(idem_key)}',
+                    'order_line': order_lines,
+                    'state': 'draft'  # Teklif olarak
                 }
-                redis_client.setex(f'quote:{quote_code}', 86400*30, json.dumps(quote_data))  # 30 gün
+                partner_id, from_cache = resolve_quote_partner(models, url, db, uid, pwd, customer_name, customer_phone)
+                try:
+                    order_id = models.execute_kw(db, uid, pwd, 'sale.order', 'create', [dict(order_data, partner_id=partner_id)])
+                except xmlrpc.client.Fault:
+                    if not from_cache: raise
+                    # Önbellekteki partner silinmiş/birleştirilmiş olabilir: önbelleği atlayıp bir kez daha dene
+                    forget_quote_partner(url, db, customer_phone)
+                    partner_id, _ = resolve_quote_partner(models, url, db, uid, pwd, customer_name, customer_phone)
+                    order_id = models.execute_kw(db, uid, pwd, 'sale.order', 'create', [dict(order_data, partner_id=partner_id)])
             except:
-                pass
+                release_quote_order(url, db, idem_key)
+                raise
+            save_quote_order(url, db, idem_key, order_id, fingerprint)
+            invalidate_customer(url, db, partner_id)
+        
+        # Cache'e kaydet (web sorgulaması için)
+        remember_quote({
+            'code': quote_code,
+            'customer_name': customer_name,
+            'customer_phone': customer_phone,
+            'odoo_order_id': order_id,
+            'items': items,
+            'created_at': datetime.now().isoformat()
+        })
         
         return jsonify({
             'status': 'success',
@@ -335,110 +1620,338 @@ def create_quote():
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)})
 
+# ========== Public Teklif Sorgulama ==========
+# Sorgu sırası: bellek içi LRU -> negatif LRU -> Redis -> bilinen kod kümesi -> Odoo (client_order_ref). Kümede olmayan kod
+# Odoo'ya hiç sorulmaz; Redis'e tek GET ile bakılır (başka worker'da oluşturulmuş olabilir), orada da yoksa negatif önbelleğe
+# yazılır ve tekrar denemeler bellekte cevaplanır. Küme açılışta Redis anahtarları ve Odoo'daki client_order_ref'lerden kurulur,
+# sonra write_date ile artımlı güncellenir. Odoo adımı için ODOO_URL/ODOO_DB/ODOO_USERNAME/ODOO_PASSWORD gerekir.
+QUOTE_TTL = 86400*30
+QUOTE_CODE_RE = re.compile(r'^[A-Za-z0-9-]{1,32}$')
+QUOTE_INDEX_REFRESH = float(os.environ.get('QUOTE_INDEX_REFRESH', 60))
+PUBLIC_ODOO = {'url': os.environ.get('ODOO_URL', ''), 'db': os.environ.get('ODOO_DB', ''),
+               'username': os.environ.get('ODOO_USERNAME', ''), 'password': os.environ.get('ODOO_PASSWORD', '')}
+
+_quote_cache = LRUCache(int(os.environ.get('QUOTE_LRU_SIZE', 2048)), 600)
+_quote_misses = LRUCache(int(os.environ.get('QUOTE_NEGATIVE_SIZE', 10000)), int(os.environ.get('QUOTE_NEGATIVE_TTL', 300)))
+
+class QuoteCodeIndex:
+    """Var olan teklif kodlarının kümesi; sadece büyür (silinen siparişin kodu Odoo'da bulunamaz ve negatif önbelleğe düşer)"""
+    def __init__(self):
+        self.codes = set()
+        self.loaded = False
+        self.last_refresh = 0
+        self.last_write_date = None
+        self.rejected = 0
+        self._sync_lock = threading.Lock()
+        self._refreshing = False
+
+    def __contains__(self, code): return code in self.codes
+
+    def add(self, code): self.codes.add(code)
+
+    def refresh(self):
+        with self._sync_lock:
+            codes = set()
+            try:
+                if not self.loaded and CACHE_ENABLED:
+                    try: codes.update(k[len('quote:'):] for k in redis_client.scan_iter('quote:*', count=1000))
+                    except: pass
+                if all(PUBLIC_ODOO.values()):
+                    url, uid, _ = get_conn(PUBLIC_ODOO)
+                    if uid:
+                        domain = [['client_order_ref', '!=', False]] + ([['write_date', '>=', self.last_write_date]] if self.last_write_date else [])
+                        rows = get_models(url).execute_kw(PUBLIC_ODOO['db'], uid, PUBLIC_ODOO['password'], 'sale.order', 'search_read', [domain],
+                            {'fields': ['client_order_ref', 'write_date'], 'context': {'active_test': False}})
+                        codes.update(r['client_order_ref'] for r in rows)
+                        self.last_write_date = max([r['write_date'] for r in rows] + ([self.last_write_date] if self.last_write_date else [])) or None
+            except Exception as e: log.error(f"Quote index refresh failed: {e}")
+            finally:
+                # Odoo erişilemese de bir sonraki denemeye kadar bekle; her tahmin Odoo'yu yoklamasın
+                self.codes |= codes
+                self.loaded = True
+                self.last_refresh = time.time()
+
+    def ensure_fresh(self):
+        """İlk kurulumu bekler; sonrasında eskiyen küme arka planda güncellenir"""
+        if not self.loaded:
+            with self._sync_lock: pass
+            if not self.loaded: return self.refresh()
+        if time.time() - self.last_refresh < QUOTE_INDEX_REFRESH or self._refreshing: return
+        self._refreshing = True
+        def run():
+            try: self.refresh()
+            finally: self._refreshing = False
+        _fanout_executor.submit(run)
+
+_quote_codes = QuoteCodeIndex()
+
+def remember_quote(quote_data):
+    """Teklifi LRU ve Redis'e yazar; negatif önbellekten çıkarır"""
+    code = quote_data['code']
+    _quote_codes.add(code)
+    _quote_misses.pop(code)
+    _quote_cache.set(code, quote_data)
+    if CACHE_ENABLED:
+        try: redis_client.setex(f'quote:{code}', QUOTE_TTL, json.dumps(quote_data))  # 30 gün
+        except: pass
+
+def load_quote_from_odoo(quote_code):
+    """Redis'te süresi dolmuş teklifi sale.order üzerinden yeniden oluşturur"""
+    if not all(PUBLIC_ODOO.values()): return None
+    url, uid, _ = get_conn(PUBLIC_ODOO)
+    if not uid: return None
+    models = get_models(url)
+    db, pwd = PUBLIC_ODOO['db'], PUBLIC_ODOO['password']
+    orders = models.execute_kw(db, uid, pwd, 'sale.order', 'search_read', [[['client_order_ref', '=', quote_code]]],
+        {'fields': ['id', 'partner_id', 'create_date'], 'order': 'id desc', 'limit': 1})
+    if not orders: return None
+    order = orders[0]
+    lines = models.execute_kw(db, uid, pwd, 'sale.order.line', 'search_read', [[['order_id', '=', order['id']], ['product_id', '!=', False]]],
+        {'fields': ['product_id', 'product_uom_qty', 'price_unit']})
+    codes = {}
+    if lines:
+        prods = models.execute_kw(db, uid, pwd, 'product.product', 'read', [list({l['product_id'][0] for l in lines})], {'fields': ['name', 'default_code']})
+        codes = {p['id']: p for p in prods}
+    items = [{'id': l['product_id'][0], 'name': codes.get(l['product_id'][0], {}).get('name') or l['product_id'][1],
+              'default_code': codes.get(l['product_id'][0], {}).get('default_code') or '',
+              'qty': l['product_uom_qty'], 'list_price': l['price_unit']} for l in lines]
+    return {'code': quote_code, 'customer_name': order['partner_id'][1] if order['partner_id'] else '', 'customer_phone': '',
+            'odoo_order_id': order['id'], 'items': items, 'created_at': order['create_date'].replace(' ', 'T')}
+
+def lookup_quote(quote_code):
+    quote_data = _quote_cache.get(quote_code)
+    if quote_data: return quote_data
+    if _quote_misses.get(quote_code): return None
+    if CACHE_ENABLED:
+        try:
+            cached = redis_client.get(f'quote:{quote_code}')
+            if cached:
+                quote_data = json.loads(cached)
+                _quote_codes.add(quote_code)
+                _quote_cache.set(quote_code, quote_data)
+                return quote_data
+        except:
+            pass
+    _quote_codes.ensure_fresh()
+    if quote_code not in _quote_codes:
+        _quote_codes.rejected += 1
+        _quote_misses.set(quote_code, True)
+        return None
+    try: quote_data = load_quote_from_odoo(quote_code)
+    except Exception as e:
+        # Odoo hatası "bulunamadı" sayılmaz; negatif önbelleğe yazılmaz
+        log.error(f"Quote lookup failed: {e}")
+        return None
+    if quote_data: remember_quote(quote_data)
+    else: _quote_misses.set(quote_code, True)
+    return quote_data
+
 @app.route('/public/quote/<quote_code>', methods=['GET'])
 def get_quote(quote_code):
     """Web sitesinden teklif sorgulamak için public API"""
     try:
-        # Önce cache'den bak
-        if CACHE_ENABLED:
-            try:
-                cached = redis_client.get(f'quote:{quote_code}')
-                if cached:
-                    quote_data = json.loads(cached)
-                    # Hassas bilgileri kaldır
-                    quote_data.pop('odoo_order_id', None)
-                    return jsonify({'status': 'success', 'quote': quote_data})
-            except:
-                pass
+        quote_data = lookup_quote(quote_code) if QUOTE_CODE_RE.match(quote_code) else None
+        if quote_data:
+            # Hassas bilgileri kaldır
+            quote_data = {k: v for k, v in quote_data.items() if k != 'odoo_order_id'}
+            return jsonify({'status': 'success', 'quote': quote_data})
         
         return jsonify({'status': 'error', 'message': 'Teklif bulunamadı'})
         
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)})
 
+# ========== Teklif Oluşturma Yardımcıları ==========
+# Sıcak yolda sadece sale.order create çağrısı kalsın diye etiket, genel ziyaretçi ve telefon->partner eşleşmeleri önbelleklenir.
+# İstemcinin her gönderim için ürettiği idempotency_key ile aynı gönderim tekrar gelirse yeni sipariş açılmaz.
+IDEMPOTENCY_KEY_RE = re.compile(r'^[A-Za-z0-9-]{1,64}$')  # crypto.randomUUID() veya teklif kodu
+QUOTE_RETRY_WINDOW = 600  # Redis yokken Odoo'da aranan yeniden deneme penceresi (saniye)
+_quote_partners = LRUCache(4096, 3600)       # (url, db, telefon) -> partner_id
+_quote_orders = LRUCache(4096, QUOTE_TTL)    # (url, db, gönderim anahtarı) -> {'order_id', 'fingerprint'}
+_quote_lock_stripes = [threading.Lock() for _ in range(64)]
+
+def quote_fingerprint(customer_name, customer_phone, items):
+    lines = sorted((i.get('id'), i.get('qty'), i.get('list_price')) for i in items)
+    return hashlib.sha1(json.dumps([customer_name, customer_phone, lines]).encode()).hexdigest()[:16]
+
+def quote_lock(url, db, idem_key): return _quote_lock_stripes[hash((url, db, idem_key)) % len(_quote_lock_stripes)]
+
+def _quote_order_key(url, db, idem_key): return f'quote-order:{url}|{db}:{idem_key}'
+
+def find_quote_order(models, url, db, uid, pwd, idem_key, quote_code):
+    """Bu gönderimle oluşturulmuş siparişi bulur: bellek -> Redis -> (Redis yoksa) son dakikalarda teklif koduyla Odoo"""
+    record = _quote_orders.get((url, db, idem_key))
+    if record: return record
+    if CACHE_ENABLED:
+        try:
+            raw = redis_client.get(_quote_order_key(url, db, idem_key))
+            return json.loads(raw) if raw else None
+        except:
+            pass
+    since = (datetime.utcnow() - timedelta(seconds=QUOTE_RETRY_WINDOW)).strftime('%Y-%m-%d %H:%M:%S')
+    # Gönderim anahtarı siparişin notuna yazılır; anahtarsız eski istemcilerde teklif koduna bakılır
+    match = ['client_order_ref', '=', quote_code] if idem_key == quote_code else ['note', 'ilike', quote_order_tag(idem_key)]
+    orders = models.execute_kw(db, uid, pwd, 'sale.order', 'search_read',
+        [[match, ['create_date', '>=', since]]], {'fields': ['id'], 'limit': 1})
+    # İçerik bilinmediği için parmak izi None: yeniden deneme kabul edilir
+    return {'order_id': orders[0]['id'], 'fingerprint': None} if orders else None
+
+def quote_order_tag(idem_key): return f'[panel:{idem_key}]'
+
+def claim_quote_order(url, db, idem_key, fingerprint):
+    """Worker'lar arası eşzamanlı aynı gönderim isteklerinden sadece biri sipariş oluşturur"""
+    if not CACHE_ENABLED: return True
+    try: return bool(redis_client.set(_quote_order_key(url, db, idem_key), json.dumps({'pending': True, 'fingerprint': fingerprint}), nx=True, ex=120))
+    except: return True
+
+def release_quote_order(url, db, idem_key):
+    if CACHE_ENABLED:
+        try: redis_client.delete(_quote_order_key(url, db, idem_key))
+        except: pass
+
+def save_quote_order(url, db, idem_key, order_id, fingerprint):
+    record = {'order_id': order_id, 'fingerprint': fingerprint}
+    _quote_orders.set((url, db, idem_key), record)
+    if CACHE_ENABLED:
+        try: redis_client.setex(_quote_order_key(url, db, idem_key), QUOTE_TTL, json.dumps(record))
+        except: pass
+
+def forget_quote_partner(url, db, customer_phone):
+    _quote_partners.pop((url, db, customer_phone))
+    if not customer_phone: ref_cache.invalidate(url, db, 'walkin_partner')
+
+def resolve_quote_partner(models, url, db, uid, pwd, customer_name, customer_phone):
+    """Teklif partner'ını bulur veya oluşturur; (partner_id, önbellekten_mi) döner"""
+    # "Mağaza Ziyaretçisi Panel" etiketini bul veya oluştur (referans önbelleğinden)
+    def load_tag():
+        tag_search = models.execute_kw(db, uid, pwd, 'res.partner.category', 'search_read',
+            [[['name', '=', 'Mağaza Ziyaretçisi Panel']]], {'fields': ['id'], 'limit': 1})
+        if tag_search:
+            return tag_search[0]['id']
+        return models.execute_kw(db, uid, pwd, 'res.partner.category', 'create', [{
+            'name': 'Mağaza Ziyaretçisi Panel'
+        }])
+    try:
+        partner_tag = ref_cache.get(url, db, 'partner_tag', load_tag)
+    except:
+        partner_tag = None  # Etiket oluşturulamazsa devam et
+
+    if not customer_phone:
+        # Genel "Mağaza Ziyaretçisi" partner'ı kullan veya oluştur
+        def load_walkin():
+            partners = models.execute_kw(db, uid, pwd, 'res.partner', 'search_read',
+                [[['name', '=', 'Mağaza Ziyaretçisi']]], {'fields': ['id'], 'limit': 1})
+            if partners:
+                return partners[0]['id']
+            partner_data = {
+                'name': 'Mağaza Ziyaretçisi',
+                'customer_rank': 1
+            }
+            if partner_tag:
+                partner_data['category_id'] = [(4, partner_tag)]
+            return models.execute_kw(db, uid, pwd, 'res.partner', 'create', [partner_data])
+        cached = ref_cache.has(url, db, 'walkin_partner')
+        return ref_cache.get(url, db, 'walkin_partner', load_walkin), cached
+
+    partner_id = _quote_partners.get((url, db, customer_phone))
+    if partner_id: return partner_id, True
+
+    # Telefon ile mevcut partner ara; etiketi zaten varsa yazma çağrısı yapılmaz
+    partners = models.execute_kw(db, uid, pwd, 'res.partner', 'search_read', 
+        [[['phone', '=', customer_phone]]], {'fields': ['id', 'category_id'], 'limit': 1})
+    if partners:
+        partner_id = partners[0]['id']
+        # Mevcut müşteriye de etiketi ekle
+        if partner_tag and partner_tag not in partners[0]['category_id']:
+            try:
+                models.execute_kw(db, uid, pwd, 'res.partner', 'write', [[partner_id], {
+                    'category_id': [(4, partner_tag)]  # Many2many add
+                }])
+            except:
+                pass
+    else:
+        # Yeni partner oluştur
+        partner_data = {
+            'name': customer_name,
+            'phone': customer_phone,
+            'customer_rank': 1
+        }
+        if partner_tag:
+            partner_data['category_id'] = [(4, partner_tag)]
+        partner_id = models.execute_kw(db, uid, pwd, 'res.partner', 'create', [partner_data])
+    _quote_partners.set((url, db, customer_phone), partner_id)
+    return partner_id, False
+
 # ========== CRM API'leri ==========
 
 @app.route('/api/customer-details/<int:partner_id>', methods=['POST'])
+@coalesced
 def customer_details(partner_id):
     """Müşteri detaylarını getirir: siparişler, faturalar, teklifler, servis kayıtları"""
     d = request.json
     try:
-        url, uid, _ = get_conn(d)
-        models = xmlrpc.client.ServerProxy(f'{url}/xmlrpc/2/object')
+        url, uid, _ = get_auth_conn(d)
+        models = get_models(url)
         db, pwd = d.get('db'), d.get('password')
         
-        # Sipariş ve Teklifler
-        orders = models.execute_kw(db, uid, pwd, 'sale.order', 'search_read',
-            [[['partner_id', '=', partner_id]]], 
-            {'fields': ['id', 'name', 'date_order', 'amount_total', 'state', 'client_order_ref'], 
-             'order': 'date_order desc', 'limit': 50})
-        
-        # Faturalar
-        invoices = []
-        try:
-            inv_raw = models.execute_kw(db, uid, pwd, 'account.move', 'search_read',
-                [[['partner_id', '=', partner_id], ['move_type', 'in', ['out_invoice', 'in_invoice']]]],
-                {'fields': ['name', 'invoice_date', 'amount_total', 'state', 'payment_state', 'move_type'],
-                 'order': 'invoice_date desc', 'limit': 50})
-            invoices = inv_raw
-        except:
-            pass
-        
-        # Teknik Servis
-        tickets = []
-        try:
-            ticket_raw = models.execute_kw(db, uid, pwd, 'helpdesk.ticket', 'search_read',
-                [[['partner_id', '=', partner_id]]],
-                {'fields': ['id', 'name', 'stage_id', 'description', 'create_date'],
-                 'order': 'create_date desc', 'limit': 50})
-            tickets = ticket_raw
-        except:
-            pass
-        
-        # Ödemeler - Tahsilat ve Ödeme olarak ayır
-        inbound_payments = []
-        outbound_payments = []
-        try:
-            payment_raw = models.execute_kw(db, uid, pwd, 'account.payment', 'search_read',
-                [[['partner_id', '=', partner_id]]],
-                {'fields': ['id', 'name', 'amount', 'date', 'state', 'payment_type', 'journal_id'],
-                 'order': 'date desc', 'limit': 100})
-            
-            # Payment_type'a göre ayır
-            for p in payment_raw:
-                if p.get('payment_type') == 'inbound':
-                    inbound_payments.append(p)
-                elif p.get('payment_type') == 'outbound':
-                    outbound_payments.append(p)
-        except:
-            pass
-        
-        return jsonify({
-            'status': 'success',
-            'orders': orders,
-            'invoices': invoices,
-            'tickets': tickets,
-            'inbound_payments': inbound_payments,  # Tahsilatlar
-            'outbound_payments': outbound_payments  # Ödemeler
-        })
+        # Alt sorgular paralel çalışır; tam sonuç kısa süre önbelleklenir (eksik sonuç önbelleğe yazılmaz)
+        view = ref_cache.get(url, db, user_cache_name(url, db, f'customer:{partner_id}', uid), lambda: load_customer_view(models, db, uid, pwd, partner_id),
+                             ttl=REF_TTLS['customer'], cache_if=lambda v: v.pop('_complete'))
+        return jsonify(dict(view, status='success'))
         
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)})
 
+def load_customer_view(models, db, uid, pwd, partner_id):
+    def search(model, domain, fields, order, limit):
+        return models.execute_kw(db, uid, pwd, model, 'search_read', [domain], {'fields': fields, 'order': order, 'limit': limit})
+    results, status = run_sections({
+        # Sipariş ve Teklifler
+        'orders': (search, ('sale.order', [['partner_id', '=', partner_id]],
+            ['id', 'name', 'date_order', 'amount_total', 'state', 'client_order_ref'], 'date_order desc', 50)),
+        # Faturalar
+        'invoices': (search, ('account.move', [['partner_id', '=', partner_id], ['move_type', 'in', ['out_invoice', 'in_invoice']]],
+            ['name', 'invoice_date', 'amount_total', 'state', 'payment_state', 'move_type'], 'invoice_date desc', 50)),
+        # Teknik Servis
+        'tickets': (search, ('helpdesk.ticket', [['partner_id', '=', partner_id]],
+            ['id', 'name', 'stage_id', 'description', 'create_date'], 'create_date desc', 50)),
+        # Ödemeler
+        'payments': (search, ('account.payment', [['partner_id', '=', partner_id]],
+            ['id', 'name', 'amount', 'date', 'state', 'payment_type', 'journal_id'], 'date desc', 100)),
+    })
+    # Siparişler gelmezse hata verilir (eski davranış); diğer bölümler boş döner
+    if results['orders'] is None: raise Exception(status['orders'].get('message', 'Siparişler alınamadı'))
+    
+    # Ödemeler - Tahsilat ve Ödeme olarak ayır
+    payments = results['payments'] or []
+    return {
+        'orders': results['orders'],
+        'invoices': results['invoices'] or [],
+        'tickets': results['tickets'] or [],
+        'inbound_payments': [p for p in payments if p.get('payment_type') == 'inbound'],  # Tahsilatlar
+        'outbound_payments': [p for p in payments if p.get('payment_type') == 'outbound'],  # Ödemeler
+        '_complete': all(st['status'] == 'ok' for st in status.values())
+    }
+
+def invalidate_customer(url, db, partner_id):
+    """Bu backend'in müşteriye yazdığı her işlemden sonra 360 görünümü önbelleğini siler"""
+    if partner_id: invalidate_user_scoped(url, db, f'customer:{partner_id}')
+
 
 @app.route('/api/payment-journals', methods=['POST'])
+@coalesced
 def payment_journals():
     """Kasa, banka ve banka hesapları için journal'ları getirir"""
     d = request.json
     try:
-        url, uid, _ = get_conn(d)
-        models = xmlrpc.client.ServerProxy(f'{url}/xmlrpc/2/object')
+        url, uid, _ = get_auth_conn(d)
+        models = get_models(url)
         db, pwd = d.get('db'), d.get('password')
         
-        # Tüm journal'ları çek (cash ve bank)
-        journals = models.execute_kw(db, uid, pwd, 'account.journal', 'search_read',
+        # Tüm journal'ları çek (cash ve bank) - referans önbelleğinden
+        journals = ref_cache.get(url, db, 'journals', lambda: models.execute_kw(db, uid, pwd, 'account.journal', 'search_read',
             [[['type', 'in', ['cash', 'bank']]]], 
-            {'fields': ['id', 'name', 'type', 'code', 'currency_id']})
+            {'fields': ['id', 'name', 'type', 'code', 'currency_id']}))
         
         cash_journals = [j for j in journals if j['type'] == 'cash']
         bank_journals = [j for j in journals if j['type'] == 'bank']
@@ -452,69 +1965,80 @@ def payment_journals():
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)})
 
+def payment_values(d):
+    """Panelden gelen ödeme bilgisinden account.payment kaydını oluşturur"""
+    partner_id = d.get('partner_id')
+    amount = d.get('amount', 0)
+    journal_id = d.get('journal_id')  # Kasa veya Banka ID
+    payment_method = d.get('payment_method', 'cash')  # cash, card, transfer
+    installments = d.get('installments', 1)  # Taksit sayısı (kredi kartı için)
+    payment_type = d.get('payment_type', 'inbound')  # inbound=tahsilat
+    date = d.get('date', '')  # Ödeme tarihi
+    note = d.get('note', '')
+    
+    # Reference oluştur
+    ref_parts = []
+    if payment_method == 'cash':
+        ref_parts.append('Nakit Ödeme')
+    elif payment_method == 'card':
+        ref_parts.append('Kredi Kartı')
+        if installments > 1:
+            ref_parts.append(f'{installments} Taksit')
+    elif payment_method == 'transfer':
+        ref_parts.append('Havale/EFT')
+    
+    if note:
+        ref_parts.append(note)
+    
+    communication = ' - '.join(ref_parts) if ref_parts else 'Panel Ödeme'
+    
+    # Ödeme kaydı oluştur - Sadece zorunlu alanlar
+    payment_data = {
+        'partner_id': partner_id,
+        'amount': amount,
+        'payment_type': payment_type,
+        'partner_type': 'customer'
+    }
+    
+    if journal_id:
+        payment_data['journal_id'] = journal_id
+    
+    if date:
+        payment_data['date'] = date
+    
+    # Not: Ödeme notunu (nakit/kredi kartı/taksit bilgisi) Odoo'nun
+    # standart account.payment modelinde saklayamıyoruz çünkü uygun alan yok.
+    # Bu bilgileri panel tarafında tutuyoruz.
+    return payment_data
+
+def post_payments(models, db, uid, pwd, payment_ids):
+    """Ödemeleri tek çağrıda onaylar; başarılıysa True"""
+    try:
+        models.execute_kw(db, uid, pwd, 'account.payment', 'action_post', [payment_ids])
+        return True
+    except:
+        # Farklı Odoo versiyonları için alternatif
+        try:
+            models.execute_kw(db, uid, pwd, 'account.payment', 'post', [payment_ids])
+            return True
+        except:
+            return False
+
 @app.route('/api/register-payment', methods=['POST'])
 def register_payment():
     """Tahsilat veya ödeme kaydeder - Gelişmiş (Journal, Taksit, Yöntem)"""
     d = request.json
     try:
         url, uid, _ = get_conn(d)
-        models = xmlrpc.client.ServerProxy(f'{url}/xmlrpc/2/object')
+        models = get_models(url)
         db, pwd = d.get('db'), d.get('password')
         
         partner_id = d.get('partner_id')
-        amount = d.get('amount', 0)
-        journal_id = d.get('journal_id')  # Kasa veya Banka ID
-        payment_method = d.get('payment_method', 'cash')  # cash, card, transfer
-        installments = d.get('installments', 1)  # Taksit sayısı (kredi kartı için)
-        payment_type = d.get('payment_type', 'inbound')  # inbound=tahsilat
-        date = d.get('date', '')  # Ödeme tarihi
-        note = d.get('note', '')
-        
-        # Reference oluştur
-        ref_parts = []
-        if payment_method == 'cash':
-            ref_parts.append('Nakit Ödeme')
-        elif payment_method == 'card':
-            ref_parts.append('Kredi Kartı')
-            if installments > 1:
-                ref_parts.append(f'{installments} Taksit')
-        elif payment_method == 'transfer':
-            ref_parts.append('Havale/EFT')
-        
-        if note:
-            ref_parts.append(note)
-        
-        communication = ' - '.join(ref_parts) if ref_parts else 'Panel Ödeme'
-        
-        # Ödeme kaydı oluştur - Sadece zorunlu alanlar
-        payment_data = {
-            'partner_id': partner_id,
-            'amount': amount,
-            'payment_type': payment_type,
-            'partner_type': 'customer'
-        }
-        
-        if journal_id:
-            payment_data['journal_id'] = journal_id
-        
-        if date:
-            payment_data['date'] = date
-        
-        # Not: Ödeme notunu (nakit/kredi kartı/taksit bilgisi) Odoo'nun
-        # standart account.payment modelinde saklayamıyoruz çünkü uygun alan yok.
-        # Bu bilgileri panel tarafında tutuyoruz.
-        
-        payment_id = models.execute_kw(db, uid, pwd, 'account.payment', 'create', [payment_data])
+        payment_id = models.execute_kw(db, uid, pwd, 'account.payment', 'create', [payment_values(d)])
+        invalidate_customer(url, db, partner_id)
         
         # Ödemeyi onayla (post)
-        try:
-            models.execute_kw(db, uid, pwd, 'account.payment', 'action_post', [[payment_id]])
-        except:
-            # Farklı Odoo versiyonları için alternatif
-            try:
-                models.execute_kw(db, uid, pwd, 'account.payment', 'post', [[payment_id]])
-            except:
-                pass
+        post_payments(models, db, uid, pwd, [payment_id])
         
         return jsonify({
             'status': 'success',
@@ -527,31 +2051,59 @@ def register_payment():
 
 # ========== Helpdesk API'leri ==========
 
+HELPDESK_STATS_DAYS = 30
+
+def _day_counts(groups, field):
+    # Odoo 15+ '__range' içinde ISO tarih verir; eski sürümlerde grup etiketi kullanılır
+    out = {}
+    for g in groups:
+        key = g.get('__range', {}).get(f'{field}:day', {}).get('from', '')[:10] or g.get(f'{field}:day')
+        if key: out[key] = g.get('__count', 0)
+    return out
+
+def load_helpdesk_stats(models, db, uid, pwd):
+    since = (datetime.now() - timedelta(days=HELPDESK_STATS_DAYS)).strftime('%Y-%m-%d 00:00:00')
+    def group(domain, groupby):
+        return models.execute_kw(db, uid, pwd, 'helpdesk.ticket', 'read_group', [domain, [groupby.split(':')[0]], [groupby]], {'lazy': False})
+    results, status = run_sections({
+        'stages': (group, ([], 'stage_id')),
+        'priority': (group, ([], 'priority')),
+        'opened': (group, ([['create_date', '>=', since]], 'create_date:day')),
+        'closed': (group, ([['close_date', '>=', since]], 'close_date:day')),
+    })
+    if results['stages'] is None: raise Exception(status['stages'].get('message', 'Helpdesk istatistikleri alınamadı'))
+
+    # Kapalı sayılan aşamalar Odoo'daki "fold" işaretine göre belirlenir
+    stage_groups = [g for g in results['stages'] if g.get('stage_id')]
+    stage_ids = [g['stage_id'][0] for g in stage_groups]
+    folded = {st['id'] for st in models.execute_kw(db, uid, pwd, 'helpdesk.stage', 'read', [stage_ids], {'fields': ['fold']}) if st['fold']} if stage_ids else set()
+    by_stage = [{'id': g['stage_id'][0], 'name': g['stage_id'][1], 'count': g['__count'], 'closed': g['stage_id'][0] in folded} for g in stage_groups]
+    by_priority = {g['priority']: g['__count'] for g in (results['priority'] or []) if g.get('priority') is not False}
+
+    return {
+        'total_open': sum(st['count'] for st in by_stage if not st['closed']),
+        'total_closed': sum(st['count'] for st in by_stage if st['closed']),
+        'total_urgent': by_priority.get('3', 0),  # Priority 3 = Urgent
+        'total': sum(g['__count'] for g in results['stages']),
+        'by_stage': by_stage,
+        'by_priority': by_priority,
+        'opened_per_day': _day_counts(results['opened'] or [], 'create_date'),
+        'closed_per_day': _day_counts(results['closed'] or [], 'close_date'),
+    }
+
 @app.route('/api/helpdesk-stats', methods=['POST'])
+@coalesced
 def helpdesk_stats():
-    """Helpdesk özet istatistikleri"""
+    """Helpdesk özet istatistikleri - Odoo tarafında read_group ile gruplanır, kısa süre önbelleklenir"""
     d = request.json
     try:
-        url, uid, _ = get_conn(d)
-        models = xmlrpc.client.ServerProxy(f'{url}/xmlrpc/2/object')
+        url, uid, _ = get_auth_conn(d)
+        models = get_models(url)
         db, pwd = d.get('db'), d.get('password')
         
-        # Tüm ticketları çek
-        all_tickets = models.execute_kw(db, uid, pwd, 'helpdesk.ticket', 'search_read',
-            [[]], {'fields': ['id', 'stage_id', 'priority']})
-        
-        # Stage'lere göre say
-        open_count = len([t for t in all_tickets if t.get('stage_id') and 'Done' not in str(t['stage_id'])])
-        closed_count = len([t for t in all_tickets if t.get('stage_id') and 'Done' in str(t['stage_id'])])
-        urgent_count = len([t for t in all_tickets if t.get('priority') == '3'])  # Priority 3 = Urgent
-        
-        return jsonify({
-            'status': 'success',
-            'total_open': open_count,
-            'total_closed': closed_count,
-            'total_urgent': urgent_count,
-            'total': len(all_tickets)
-        })
+        stats = ref_cache.get(url, db, user_cache_name(url, db, 'helpdesk_stats', uid), lambda: load_helpdesk_stats(models, db, uid, pwd),
+                              ttl=REF_TTLS['helpdesk_stats'])
+        return jsonify(dict(stats, status='success'))
         
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)})
@@ -562,7 +2114,7 @@ def ticket_update():
     d = request.json
     try:
         url, uid, _ = get_conn(d)
-        models = xmlrpc.client.ServerProxy(f'{url}/xmlrpc/2/object')
+        models = get_models(url)
         db, pwd = d.get('db'), d.get('password')
         
         ticket_id = d.get('ticket_id')
@@ -575,6 +2127,10 @@ def ticket_update():
         
         if update_data:
             models.execute_kw(db, uid, pwd, 'helpdesk.ticket', 'write', [[ticket_id], update_data])
+            invalidate_user_scoped(url, db, 'helpdesk_stats')
+            # Müşteri 360 görünümündeki servis kayıtları da değişti
+            ticket = models.execute_kw(db, uid, pwd, 'helpdesk.ticket', 'read', [[ticket_id]], {'fields': ['partner_id']})
+            if ticket and ticket[0]['partner_id']: invalidate_customer(url, db, ticket[0]['partner_id'][0])
         
         # Not ekle (message_post)
         if note:
@@ -594,5 +2150,122 @@ def ticket_update():
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)})
 
-if __name__ == '__main__': app.run(host='0.0.0.0', port=5000)
+# ========== Toplu İşlemler ==========
+# Gün sonu kasa mutabakatı gibi durumlar için ödemeler ve ticket güncellemeleri liste halinde alınır.
+# Kayıtlar BULK_CHUNK'lık partiler halinde tek create/write çağrısıyla yazılır, partiler en fazla
+# BULK_CONCURRENCY paralel çalışır; sonuç her öğe için ayrı döner.
+BULK_CHUNK = int(os.environ.get('BULK_CHUNK', 50))
+BULK_CONCURRENCY = int(os.environ.get('BULK_CONCURRENCY', 4))
+BULK_MAX_ITEMS = 500
+
+def map_bounded(fn, items, limit=BULK_CONCURRENCY):
+    """fn'i öğeler üzerinde en fazla limit paralellikle çalıştırır; [(sonuç, hata), ...] döner"""
+    out = []
+    for i in range(0, len(items), limit):
+        futures = [submit_traced(fn, item) for item in items[i:i + limit]]
+        for fut in futures:
+            try: out.append((fut.result(), None))
+            except Exception as e: out.append((None, e))
+    return out
+
+def _chunks(items, size=BULK_CHUNK): return [items[i:i + size] for i in range(0, len(items), size)]
+
+@app.route('/api/register-payments', methods=['POST'])
+def register_payments():
+    """Toplu tahsilat/ödeme kaydı - partiler halinde create, tek action_post"""
+    d = request.json
+    try:
+        url, uid, _ = get_conn(d)
+        models = get_models(url)
+        db, pwd = d.get('db'), d.get('password')
+        
+        payments = d.get('payments') or []
+        if len(payments) > BULK_MAX_ITEMS: return jsonify({'status': 'error', 'message': f'En fazla {BULK_MAX_ITEMS} kayıt gönderilebilir'})
+        results = [{'index': i, 'status': 'error', 'message': 'İşlenmedi'} for i in range(len(payments))]
+        items = []
+        for i, p in enumerate(payments):
+            if not p.get('partner_id') or not p.get('amount'): results[i]['message'] = 'partner_id ve amount zorunlu'
+            else: items.append((i, payment_values(p)))
+        
+        # Parti halinde create; hatalı kayıt içeren parti tek tek yeniden denenir
+        def create(chunk): return models.execute_kw(db, uid, pwd, 'account.payment', 'create', [[vals for _, vals in chunk]])
+        created, retry = [], []
+        for chunk, (ids, error) in zip(_chunks(items), map_bounded(create, _chunks(items))):
+            if error is None: created += [(i, pid) for (i, _), pid in zip(chunk, ids)]
+            elif len(chunk) == 1: results[chunk[0][0]]['message'] = str(error)
+            else: retry += chunk
+        for (i, _), (ids, error) in zip(retry, map_bounded(create, [[item] for item in retry])):
+            if error is None: created.append((i, ids[0]))
+            else: results[i]['message'] = str(error)
+        
+        # Ödemeleri tek çağrıda onayla; olmazsa tek tek onayla ki hangisinin kaldığı bilinsin
+        all_ids = [pid for _, pid in created]
+        if all_ids and post_payments(models, db, uid, pwd, all_ids): posted = {pid: True for pid in all_ids}
+        else: posted = dict(zip(all_ids, (ok for ok, _ in map_bounded(lambda pid: post_payments(models, db, uid, pwd, [pid]), all_ids))))
+        for i, pid in created:
+            results[i] = {'index': i, 'status': 'success', 'payment_id': pid, 'posted': bool(posted.get(pid))}
+        
+        for partner_id in {payments[i]['partner_id'] for i, _ in created}: invalidate_customer(url, db, partner_id)
+        succeeded = sum(1 for r in results if r['status'] == 'success')
+        return jsonify({'status': 'success', 'results': results, 'succeeded': succeeded, 'failed': len(results) - succeeded})
+        
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)})
+
+@app.route('/api/ticket-updates', methods=['POST'])
+def ticket_updates():
+    """Toplu ticket güncelleme - aynı aşamaya geçen ticketlar tek write ile yazılır"""
+    d = request.json
+    try:
+        url, uid, _ = get_conn(d)
+        models = get_models(url)
+        db, pwd = d.get('db'), d.get('password')
+        
+        updates = d.get('updates') or []
+        if len(updates) > BULK_MAX_ITEMS: return jsonify({'status': 'error', 'message': f'En fazla {BULK_MAX_ITEMS} kayıt gönderilebilir'})
+        results = [{'index': i, 'ticket_id': u.get('ticket_id'), 'status': 'success'} for i, u in enumerate(updates)]
+        for r in results:
+            if not r['ticket_id']: r.update(status='error', message='ticket_id zorunlu')
+        
+        # Aşama değişiklikleri: aşama başına tek write; hata olursa o grup tek tek yazılır
+        groups = {}
+        for i, u in enumerate(updates):
+            if results[i]['status'] == 'success' and u.get('stage_id'): groups.setdefault(u['stage_id'], []).append(i)
+        def write(job):
+            stage_id, indexes = job
+            return models.execute_kw(db, uid, pwd, 'helpdesk.ticket', 'write', [[updates[i]['ticket_id'] for i in indexes], {'stage_id': stage_id}])
+        jobs = [(stage_id, chunk) for stage_id, indexes in groups.items() for chunk in _chunks(indexes)]
+        retry = []
+        for (stage_id, indexes), (_, error) in zip(jobs, map_bounded(write, jobs)):
+            if error is not None: retry += [(stage_id, [i]) for i in indexes]
+        for (stage_id, [i]), (_, error) in zip(retry, map_bounded(write, retry)):
+            if error is not None: results[i].update(status='error', message=str(error))
+        
+        # Not ekle (message_post tek kayıt üzerinde çalışır)
+        notes = [i for i, u in enumerate(updates) if results[i]['status'] == 'success' and u.get('note')]
+        def post_note(i):
+            return models.execute_kw(db, uid, pwd, 'helpdesk.ticket', 'message_post', [[updates[i]['ticket_id']]], {
+                'body': updates[i]['note'],
+                'message_type': 'comment'
+            })
+        for i, (_, error) in zip(notes, map_bounded(post_note, notes)):
+            if error is not None: results[i]['note_error'] = str(error)
+        
+        # İstatistik ve müşteri 360 önbelleklerini temizle
+        written = [updates[i]['ticket_id'] for indexes in groups.values() for i in indexes if results[i]['status'] == 'success']
+        if written:
+            invalidate_user_scoped(url, db, 'helpdesk_stats')
+            try:
+                tickets = models.execute_kw(db, uid, pwd, 'helpdesk.ticket', 'read', [written], {'fields': ['partner_id']})
+                for partner_id in {t['partner_id'][0] for t in tickets if t['partner_id']}: invalidate_customer(url, db, partner_id)
+            except:
+                pass
+        
+        succeeded = sum(1 for r in results if r['status'] == 'success')
+        return jsonify({'status': 'success', 'results': results, 'succeeded': succeeded, 'failed': len(results) - succeeded})
+        
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)})
+
+if __name__ == '__main__': app.run(host='0.0.0.0', port=5000, threaded=True)
 
@@ -0,0 +1,17 @@
+# Gunicorn ayarları - Odoo XML-RPC çağrıları bloklayıcı olduğu için thread'li (gthread) worker kullanılır.
+# Bir tablette yavaş dashboard yüklenirken diğer istekler aynı worker'ın boşta thread'lerinde çalışır.
+# Uygulama içindeki önbellekler, bağlantı havuzu ve Redis istemcisi thread-safe'tir.
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+worker_class = 'gthread'
+# Redis yoksa oturum anahtarları process belleğinde tutulur; başka worker'a düşen istek 401 alır. Bu yüzden varsayılan tek worker
+workers = int(os.environ.get('GUNICORN_WORKERS', 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 16))
+# Dashboard ilk oluşturma ve NDJSON akışları uzun sürebilir
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+graceful_timeout = 30
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+# preload kullanılmaz: arka plan thread'leri (dashboard zamanlayıcısı) fork sonrası her worker'da ayrı başlar
+preload_app = False
+accesslog = '-'
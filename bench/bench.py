@@ -0,0 +1,133 @@
+"""Backend benchmark'ı - canlı Odoo gerektirmez.
+
+Sahte Odoo sunucusunu (fake_odoo.py) başlatır, backend/app.py'deki her uç noktayı Flask test istemcisiyle
+çalıştırır ve uç nokta başına gecikme yüzdeliklerini (p50/p95/p99), yanıt boyutunu ve istek başına Odoo
+çağrı sayısını raporlar.
+
+    python bench/bench.py --products 5000 --latency 20 --iterations 30
+    python bench/bench.py --json > bench_output.txt
+
+Not: Katalog senkronu ve dashboard zamanlayıcısı arka planda da Odoo çağrısı yapabilir; bu çağrılar o sırada
+ölçülen isteğe yazılabilir.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+import fake_odoo
+
+
+def percentile(values, p):
+    values = sorted(values)
+    if not values: return 0
+    k = (len(values) - 1) * p / 100
+    lo, hi = int(k), min(int(k) + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+def scenarios(session, sizes, creds, since):
+    """(ad, method, yol, gövde fonksiyonu) listesi; gövde fonksiyonu iterasyon numarasını alır"""
+    body = lambda extra=None: (lambda i: dict({'session': session}, **(extra(i) if callable(extra) else extra or {})))
+    partner = lambda i: 1 + i % sizes['partners']
+    return [
+        ('connect', 'POST', '/api/connect', lambda i: creds),
+        ('dashboard-data', 'POST', '/api/dashboard-data', body()),
+        ('search product', 'POST', '/api/search', body(lambda i: {'model': 'product.product', 'query': ['koltuk', 'masa', 'ASC001', 'sehpa be'][i % 4]})),
+        ('search partner', 'POST', '/api/search', body(lambda i: {'model': 'res.partner', 'query': f'Müşteri {partner(i)}'})),
+        ('search order', 'POST', '/api/search', body(lambda i: {'model': 'sale.order', 'query': f'S{1 + i % sizes["orders"]:05d}'})),
+        ('list products', 'POST', '/api/list/products', body({'limit': 200})),
+        ('list products stream', 'POST', '/api/list/products', body({'limit': 500, 'stream': True})),
+        ('list orders', 'POST', '/api/list/orders', body({'limit': 200})),
+        ('changes head', 'POST', '/api/changes', body()),
+        ('changes since', 'POST', '/api/changes', body({'since': since})),
+        ('order-details', 'POST', '/api/order-details', body(lambda i: {'order_id': 1 + i % sizes['orders']})),
+        ('order-details batch', 'POST', '/api/order-details', body(lambda i: {'order_ids': list(range(1, min(sizes['orders'], 100) + 1))})),
+        ('customer-details', 'POST', None, body()),
+        ('payment-journals', 'POST', '/api/payment-journals', body()),
+        ('helpdesk-stats', 'POST', '/api/helpdesk-stats', body()),
+        ('create-quote', 'POST', '/api/create-quote', body(lambda i: {'quote_code': f'BENCH-{time.time_ns()}', 'customer_name': 'Bench',
+                                                                      'customer_phone': f'0500{i % 5:07d}', 'items': [{'id': 1, 'qty': 1, 'list_price': 100}]})),
+        ('register-payment', 'POST', '/api/register-payment', body(lambda i: {'partner_id': partner(i), 'amount': 100, 'journal_id': 1})),
+        ('ticket-update', 'POST', '/api/ticket-update', body(lambda i: {'ticket_id': 1 + i % sizes['tickets'], 'stage_id': 2, 'note': 'bench'})),
+        ('register-payments 50', 'POST', '/api/register-payments', body(lambda i: {'payments': [
+            {'partner_id': partner(i + j), 'amount': 100, 'journal_id': 1} for j in range(50)]})),
+        ('ticket-updates 50', 'POST', '/api/ticket-updates', body(lambda i: {'updates': [
+            {'ticket_id': 1 + (i + j) % sizes['tickets'], 'stage_id': 1 + j % 2, 'note': 'bench'} for j in range(50)]})),
+        ('public quote', 'GET', None, None),
+        ('public quote miss', 'GET', None, None),
+        ('product image', 'GET', '/img/product/1/128', None),
+    ]
+
+
+def run(args):
+    sizes = {k: getattr(args, k) for k in fake_odoo.SIZES}
+    server, odoo, url = fake_odoo.serve(0, sizes, args.latency)
+    os.environ.update(ODOO_URL=url, ODOO_DB=fake_odoo.DB, ODOO_USERNAME=fake_odoo.USERNAME, ODOO_PASSWORD=fake_odoo.PASSWORD)
+    os.environ.setdefault('TRACE_LOG', '0')  # İstek başına JSON log ölçümü bozmasın
+    os.environ.setdefault('RATE_LIMIT_RATE', '0')  # Tek kullanıcıdan art arda istekler hız sınırına takılmasın
+    import app as backend
+    client = backend.app.test_client()
+
+    creds = {'url': url, 'db': fake_odoo.DB, 'username': fake_odoo.USERNAME, 'password': fake_odoo.PASSWORD}
+    login = client.post('/api/connect', json=creds).get_json()
+    if login.get('status') != 'success': sys.exit(f'Giriş başarısız: {login}')
+    session = login['session']
+    since = client.post('/api/changes', json={'session': session}).get_json()['token']  # 'changes since' bu anahtardan sorgular
+
+    results = []
+    for name, method, path, make_body in scenarios(session, sizes, creds, since):
+        if args.only and not any(o in name for o in args.only): continue
+        latencies, sizes_b, calls = [], [], []
+        for i in range(args.iterations + args.warmup):
+            if name == 'customer-details': req_path = f'/api/customer-details/{1 + i % sizes["partners"]}'
+            elif name == 'public quote': req_path = f'/public/quote/ASC-{1001 + i % sizes["orders"]}'
+            elif name == 'public quote miss': req_path = f'/public/quote/NOPE-{i}'
+            else: req_path = path
+            before = odoo.total_calls()
+            started = time.perf_counter()
+            if method == 'GET': resp = client.get(req_path, headers={'Accept-Encoding': 'gzip, br'})
+            else: resp = client.post(req_path, json=make_body(i), headers={'Accept-Encoding': 'gzip, br'})
+            payload = resp.get_data()
+            elapsed = (time.perf_counter() - started) * 1000
+            if i < args.warmup: continue
+            latencies.append(elapsed)
+            sizes_b.append(len(payload))
+            calls.append(odoo.total_calls() - before)
+        results.append({
+            'endpoint': name, 'n': len(latencies),
+            'p50_ms': round(percentile(latencies, 50), 2), 'p95_ms': round(percentile(latencies, 95), 2), 'p99_ms': round(percentile(latencies, 99), 2),
+            'bytes': int(statistics.mean(sizes_b)) if sizes_b else 0, 'odoo_calls': round(statistics.mean(calls), 2) if calls else 0,
+        })
+    server.shutdown()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Ascari backend benchmark (sahte Odoo ile)')
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--warmup', type=int, default=2)
+    parser.add_argument('--latency', type=float, default=10, help='Sahte Odoo çağrı başına gecikme (ms)')
+    parser.add_argument('--only', nargs='*', help='Sadece adı bu ifadeleri içeren uç noktalar')
+    parser.add_argument('--json', action='store_true', help='Sonucu JSON olarak yaz')
+    for name, default in fake_odoo.SIZES.items(): parser.add_argument(f'--{name}', type=int, default=default)
+    args = parser.parse_args()
+
+    results = run(args)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    header = f"{'uç nokta':<22}{'n':>5}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'bayt':>12}{'odoo çağrı':>12}"
+    print(header)
+    print('-' * len(header))
+    for r in results:
+        print(f"{r['endpoint']:<22}{r['n']:>5}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}{r['bytes']:>12}{r['odoo_calls']:>12}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,262 @@
+"""Benchmark için yerel sahte Odoo XML-RPC sunucusu.
+
+/xmlrpc/2/common (authenticate) ve /xmlrpc/2/object (execute_kw) uç noktalarını, ayarlanabilir boyutta
+sentetik verilerle ve isteğe bağlı yapay gecikmeyle sunar. Her çağrı (model, method) bazında sayılır.
+
+    python bench/fake_odoo.py --port 8069 --products 5000 --latency 20
+"""
+import argparse
+import base64
+import random
+import socketserver
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from xmlrpc.server import SimpleXMLRPCServer, SimpleXMLRPCRequestHandler
+import xmlrpc.client
+
+DB, USERNAME, PASSWORD, UID = 'bench', 'admin', 'admin', 2
+SIZES = {'products': 2000, 'orders': 500, 'partners': 300, 'tickets': 400, 'invoices': 300, 'payments': 600}
+# 1x1 PNG
+PNG = base64.b64encode(bytes.fromhex('89504e470d0a1a0a0000000d49484452000000010000000108060000001f15c4890000000d49444154789c6360000000000200015e2d3a7c0000000049454e44ae426082')).decode()
+
+
+def _ts(dt): return dt.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def generate(sizes=SIZES, seed=1):
+    """{model: {id: kayıt}} sentetik veri seti"""
+    rnd = random.Random(seed)
+    now = datetime(2026, 10, 1, 12, 0, 0)
+    data = {m: {} for m in ['product.category', 'product.product', 'account.tax', 'res.partner', 'res.partner.category',
+                            'sale.order', 'sale.order.line', 'helpdesk.stage', 'helpdesk.ticket', 'account.move',
+                            'account.payment', 'account.journal', 'stock.quant']}
+    data['product.category'] = {1: {'id': 1, 'name': 'Ticari Mal', 'parent_id': False}}
+    for i in range(2, 22):
+        parent = 1 if i < 7 else rnd.randint(2, 6)
+        data['product.category'][i] = {'id': i, 'name': f'Kategori {i}', 'parent_id': [parent, f'Kategori {parent}']}
+    data['account.tax'] = {1: {'id': 1, 'amount': 20.0}, 2: {'id': 2, 'amount': 10.0}, 3: {'id': 3, 'amount': 1.0}}
+    words = ['Koltuk', 'Sehpa', 'Masa', 'Sandalye', 'Berjer', 'Kanepe', 'Dolap', 'Yatak', 'Komodin', 'Puf']
+    for i in range(1, sizes['products'] + 1):
+        categ = rnd.randint(2, 21)
+        data['product.product'][i] = {
+            'id': i, 'name': f'{rnd.choice(words)} {rnd.choice(words)} {i}', 'default_code': f'ASC{i:05d}',
+            'list_price': round(rnd.uniform(500, 50000), 2), 'categ_id': [categ, f'Ticari Mal / Kategori {categ}'],
+            'image_128': PNG if i % 3 else False, 'x_assembled_width': rnd.randint(40, 240), 'x_assembled_depth': rnd.randint(40, 120),
+            'x_assembled_height': rnd.randint(40, 120), 'qty_available': rnd.randint(0, 30), 'taxes_id': [rnd.choice([1, 1, 1, 2])],
+            'sale_ok': True, 'active': True, 'write_date': _ts(now - timedelta(days=rnd.randint(0, 300))),
+        }
+        data['product.product'][i]['display_name'] = f"[{data['product.product'][i]['default_code']}] {data['product.product'][i]['name']}"
+        # Tek depo; alan adı olarak 'location_id.usage' domain'deki ilişkili alan yolunu karşılar
+        data['stock.quant'][i] = {'id': i, 'product_id': [i, data['product.product'][i]['display_name']], 'location_id.usage': 'internal',
+                                  'quantity': data['product.product'][i]['qty_available'], 'write_date': data['product.product'][i]['write_date']}
+    for i in range(1, sizes['partners'] + 1):
+        data['res.partner'][i] = {'id': i, 'name': f'Müşteri {i}', 'phone': f'0555{i:07d}', 'email': f'musteri{i}@example.com',
+                                  'total_due': round(rnd.uniform(0, 10000), 2), 'is_company': i % 5 == 0, 'category_id': [], 'customer_rank': 1}
+    line_id = 0
+    for i in range(1, sizes['orders'] + 1):
+        partner = rnd.randint(1, sizes['partners'])
+        lines = []
+        for _ in range(rnd.randint(1, 5)):
+            line_id += 1
+            prod = rnd.randint(1, sizes['products'])
+            qty = rnd.randint(1, 4)
+            price = data['product.product'][prod]['list_price']
+            data['sale.order.line'][line_id] = {'id': line_id, 'order_id': [i, f'S{i:05d}'], 'product_id': [prod, data['product.product'][prod]['display_name']],
+                                                'name': data['product.product'][prod]['display_name'], 'product_uom_qty': qty, 'price_unit': price, 'price_subtotal': qty * price}
+            lines.append(line_id)
+        date = _ts(now - timedelta(hours=rnd.randint(0, 24 * 120)))
+        data['sale.order'][i] = {'id': i, 'name': f'S{i:05d}', 'partner_id': [partner, f'Müşteri {partner}'], 'date_order': date,
+                                 'create_date': date, 'write_date': date, 'amount_total': sum(data['sale.order.line'][l]['price_subtotal'] for l in lines),
+                                 'state': rnd.choice(['draft', 'sale', 'done', 'cancel']), 'client_order_ref': f'ASC-{1000 + i}', 'order_line': lines, 'note': ''}
+    data['helpdesk.stage'] = {1: {'id': 1, 'name': 'Yeni', 'fold': False}, 2: {'id': 2, 'name': 'İşlemde', 'fold': False}, 3: {'id': 3, 'name': 'Çözüldü', 'fold': True}}
+    for i in range(1, sizes['tickets'] + 1):
+        partner = rnd.randint(1, sizes['partners'])
+        stage = rnd.randint(1, 3)
+        created = now - timedelta(days=rnd.randint(0, 60))
+        data['helpdesk.ticket'][i] = {'id': i, 'name': f'Servis {i}', 'partner_id': [partner, f'Müşteri {partner}'],
+                                      'stage_id': [stage, data['helpdesk.stage'][stage]['name']], 'priority': rnd.choice(['0', '1', '2', '3']),
+                                      'description': 'Ayak kırık', 'create_date': _ts(created), 'write_date': _ts(created),
+                                      'close_date': _ts(created + timedelta(days=2)) if stage == 3 else False}
+    for i in range(1, sizes['invoices'] + 1):
+        partner = rnd.randint(1, sizes['partners'])
+        date = (now - timedelta(days=rnd.randint(0, 120))).strftime('%Y-%m-%d')
+        data['account.move'][i] = {'id': i, 'name': f'INV/2026/{i:05d}', 'partner_id': [partner, f'Müşteri {partner}'], 'invoice_date': date,
+                                   'amount_total': round(rnd.uniform(100, 50000), 2), 'state': 'posted', 'payment_state': rnd.choice(['paid', 'not_paid']),
+                                   'move_type': rnd.choice(['out_invoice', 'out_invoice', 'in_invoice']), 'write_date': date + ' 00:00:00'}
+    data['account.journal'] = {1: {'id': 1, 'name': 'Kasa', 'type': 'cash', 'code': 'CSH1', 'currency_id': False},
+                               2: {'id': 2, 'name': 'Banka', 'type': 'bank', 'code': 'BNK1', 'currency_id': False}}
+    for i in range(1, sizes['payments'] + 1):
+        partner = rnd.randint(1, sizes['partners'])
+        data['account.payment'][i] = {'id': i, 'name': f'PAY/{i:05d}', 'partner_id': [partner, f'Müşteri {partner}'], 'amount': round(rnd.uniform(100, 5000), 2),
+                                      'date': (now - timedelta(days=rnd.randint(0, 120))).strftime('%Y-%m-%d'), 'state': 'posted',
+                                      'payment_type': rnd.choice(['inbound', 'outbound']), 'journal_id': [1, 'Kasa']}
+    return data
+
+
+class FakeOdoo:
+    """Sahte Odoo veri modeli ve XML-RPC fonksiyonları"""
+    def __init__(self, sizes=SIZES, latency_ms=0, seed=1):
+        self.data = generate(dict(SIZES, **sizes), seed)
+        self.latency = latency_ms / 1000.0
+        self.calls = Counter()
+        self._lock = threading.Lock()
+
+    # --- domain değerlendirme ---
+    def _value(self, rec, field):
+        v = rec.get(field, False)
+        return v[0] if isinstance(v, list) and len(v) == 2 and isinstance(v[0], int) and isinstance(v[1], str) else v
+
+    def _leaf(self, model, rec, leaf):
+        field, op, val = leaf
+        v = self._value(rec, field)
+        if op == 'child_of':
+            while v:
+                if v == val: return True
+                v = self._value(self.data[model].get(v, {}), 'parent_id')
+            return False
+        if op == 'ilike':
+            hay = rec.get(field)
+            hay = hay[1] if isinstance(hay, list) else hay
+            return bool(hay) and str(val).lower() in str(hay).lower()
+        if op == 'in': return v in val or (isinstance(v, list) and bool(set(v) & set(val)))
+        if op == 'not in': return v not in val
+        if op == '=': return v == val or (isinstance(v, list) and val in v)
+        if op == '!=': return v != val
+        if v is False or v is None: return False
+        return {'>': v > val, '>=': v >= val, '<': v < val, '<=': v <= val}[op]
+
+    def _match(self, model, rec, domain):
+        def parse(i):
+            tok = domain[i]
+            if tok in ('|', '&'):
+                a, i = parse(i + 1)
+                b, i = parse(i)
+                return (a or b) if tok == '|' else (a and b), i
+            if tok == '!':
+                a, i = parse(i + 1)
+                return not a, i
+            return self._leaf(model, rec, tok), i + 1
+        i, ok = 0, True
+        while i < len(domain):
+            r, i = parse(i)
+            ok = ok and r
+        return ok
+
+    def _search(self, model, domain, kw):
+        recs = [r for r in self.data[model].values() if self._match(model, r, domain or [])]
+        if kw.get('context', {}).get('active_test', True) and model == 'product.product':
+            recs = [r for r in recs if r.get('active', True)]
+        for part in reversed((kw.get('order') or 'id').split(',')):
+            field, *direction = part.strip().split()
+            recs.sort(key=lambda r: (r.get(field) is False, r.get(field) if not isinstance(r.get(field), list) else r.get(field)[0]),
+                      reverse=bool(direction and direction[0].lower() == 'desc'))
+        offset, limit = kw.get('offset', 0), kw.get('limit')
+        return recs[offset:offset + limit if limit else None]
+
+    def _fields(self, recs, fields):
+        return [{f: r.get(f, False) for f in (fields or r.keys())} | {'id': r['id']} for r in recs]
+
+    # --- XML-RPC ---
+    def authenticate(self, db, username, password, ctx):
+        self._hit('common', 'authenticate')
+        return UID if (db, username, password) == (DB, USERNAME, PASSWORD) else False
+
+    def execute_kw(self, db, uid, pwd, model, method, args, kw=None):
+        kw = kw or {}
+        self._hit(model, method)
+        if (db, uid, pwd) != (DB, UID, PASSWORD): raise xmlrpc.client.Fault(3, 'odoo.exceptions.AccessDenied')
+        if model not in self.data: raise xmlrpc.client.Fault(2, f"Object {model} doesn't exist")
+        table = self.data[model]
+        if method == 'search_read':
+            return self._fields(self._search(model, args[0] if args else [], kw), kw.get('fields'))
+        if method == 'search':
+            return [r['id'] for r in self._search(model, args[0], kw)]
+        if method == 'search_count':
+            return len(self._search(model, args[0], {}))
+        if method == 'read':
+            return self._fields([table[i] for i in args[0] if i in table], kw.get('fields') or (args[1] if len(args) > 1 else None))
+        if method == 'read_group':
+            return self._read_group(model, args[0], args[2], kw)
+        if method == 'create':
+            vals_list = args[0] if isinstance(args[0], list) else [args[0]]
+            ids = [self._create(model, vals) for vals in vals_list]
+            return ids if isinstance(args[0], list) else ids[0]
+        if method == 'write':
+            for i in args[0]:
+                if i in table: table[i].update({k: v for k, v in args[1].items() if k != 'category_id'}, write_date=_ts(datetime.now()))
+            return True
+        if method in ('action_post', 'post', 'message_post', 'unlink'):
+            if method == 'unlink':
+                for i in args[0]: table.pop(i, None)
+            return True
+        raise xmlrpc.client.Fault(2, f'Unknown method {method}')
+
+    def _create(self, model, vals):
+        with self._lock:
+            table = self.data[model]
+            new_id = max(table, default=0) + 1
+            rec = {k: v for k, v in vals.items() if k not in ('order_line', 'category_id')}
+            rec.update(id=new_id, create_date=_ts(datetime.now()), write_date=_ts(datetime.now()))
+            if 'partner_id' in rec and isinstance(rec['partner_id'], int):
+                rec['partner_id'] = [rec['partner_id'], self.data['res.partner'].get(rec['partner_id'], {}).get('name', '')]
+            table[new_id] = rec
+            return new_id
+
+    def _read_group(self, model, domain, groupby, kw):
+        field, _, interval = groupby[0].partition(':')
+        groups = {}
+        for r in self._search(model, domain, {}):
+            v = r.get(field, False)
+            if interval == 'day' and v: v = v[:10]
+            key = tuple(v) if isinstance(v, list) else v
+            groups.setdefault(key, [v, 0])[1] += 1
+        out = []
+        for v, count in groups.values():
+            g = {groupby[0]: v, '__count': count}
+            if interval == 'day' and v: g['__range'] = {groupby[0]: {'from': f'{v} 00:00:00', 'to': f'{v} 23:59:59'}}
+            out.append(g)
+        return out
+
+    def _hit(self, model, method):
+        with self._lock: self.calls[(model, method)] += 1
+        if self.latency: time.sleep(self.latency)
+
+    def total_calls(self):
+        with self._lock: return sum(self.calls.values())
+
+
+class _Handler(SimpleXMLRPCRequestHandler):
+    rpc_paths = ('/xmlrpc/2/common', '/xmlrpc/2/object')
+    protocol_version = 'HTTP/1.1'  # keep-alive
+
+    def log_message(self, *args): pass
+
+
+class _Server(socketserver.ThreadingMixIn, SimpleXMLRPCServer):
+    daemon_threads = True
+
+
+def serve(port=0, sizes=SIZES, latency_ms=0, seed=1):
+    """Sunucuyu arka planda başlatır; (sunucu, FakeOdoo, url) döner"""
+    odoo = FakeOdoo(sizes, latency_ms, seed)
+    server = _Server(('127.0.0.1', port), requestHandler=_Handler, allow_none=True, logRequests=False)
+    server.register_function(odoo.authenticate, 'authenticate')
+    server.register_function(odoo.execute_kw, 'execute_kw')
+    threading.Thread(target=server.serve_forever, daemon=True, name='fake-odoo').start()
+    return server, odoo, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Sahte Odoo XML-RPC sunucusu')
+    parser.add_argument('--port', type=int, default=8069)
+    parser.add_argument('--latency', type=float, default=0, help='Çağrı başına yapay gecikme (ms)')
+    for name, default in SIZES.items(): parser.add_argument(f'--{name}', type=int, default=default)
+    args = parser.parse_args()
+    server, odoo, url = serve(args.port, {k: getattr(args, k) for k in SIZES}, args.latency)
+    print(f'Sahte Odoo: {url}  db={DB} kullanıcı={USERNAME} şifre={PASSWORD}')
+    try:
+        while True: time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -78,6 +78,20 @@ const MENU_ITEMS = [
   { id: 'code', name: 'Entegrasyon', icon: Code, roles: ['admin'] }
 ];
 
+// Her sekme ilk açıldığında sadece kendi bölümlerini yükler; alan listesi verilmeyen bölüm tüm alanlarla gelir
+const TAB_SECTIONS = {
+  dashboard: { orders: ['id_raw', 'status', 'amount'], customers: ['id'], tickets: ['id'] },
+  quick_offer: { categories: null, products: null },
+  helpdesk: { tickets: null },
+  sales: { orders: null },
+  customers: { customers: null, orders: null, invoices: null, tickets: null },
+  accounting: { invoices: null }
+};
+
+// Değişiklik akışı: bölüm -> kayıt anahtarı
+const CHANGE_KEYS = { orders: 'id_raw', products: 'id', tickets: 'id', invoices: 'id' };
+const CHANGES_POLL_MS = 30000;
+
 // Kategori Ağacı - Geliştirilmiş (Tek Tıkla Aç + Filtrele)
 const CategoryTree = ({ categories, onSelect, selectedId }) => {
   const [expanded, setExpanded] = useState({});
@@ -115,7 +129,7 @@ const ProductCard = ({ product, onAdd, onInfo }) => {
   return (
     <div onClick={() => onAdd(product)} className="bg-white border-2 border-slate-200 rounded-lg p-4 flex gap-4 hover:shadow-lg hover:border-indigo-300 transition-all relative group min-h-[120px] cursor-pointer active:scale-95 active:shadow-xl transition-transform duration-150 touch-manipulation">
       <div className="w-28 h-full flex-shrink-0 bg-slate-50 rounded-md flex items-center justify-center overflow-hidden border border-slate-100">
-        {product.image_128 ? <img src={`data:image/png;base64,${product.image_128}`} className="object-contain w-full h-full" /> : <Package className="text-slate-300 w-10 h-10" />}
+        {product.image_url ? <img src={product.image_url} loading="lazy" className="object-contain w-full h-full" /> : <Package className="text-slate-300 w-10 h-10" />}
       </div>
       <div className="flex-1 flex flex-col justify-between py-1">
         <div>
@@ -223,16 +237,26 @@ export default function AscariDashboard() {
   const [newTicketData, setNewTicketData] = useState({ customer: '', product: '', issue: '', priority: 'medium' });
   const [isEditingProduct, setIsEditingProduct] = useState(false);
 
-  // API Fonksiyonu
-  const apiCall = async (endpoint, payload) => {
+  // API Fonksiyonu - Girişten sonra şifre yerine oturum anahtarı gönderilir
+  const sessionRef = useRef(null);
+  const postApi = (endpoint, body) => fetch(`/api/${endpoint}`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify(body)
+  });
+  const apiCall = async (endpoint, payload, { returnErrors = false } = {}) => {
     try {
-      const res = await fetch(`/api/${endpoint}`, {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ ...credentials, ...payload })
-      });
+      let res = await postApi(endpoint, sessionRef.current ? { session: sessionRef.current, ...payload } : { ...credentials, ...payload });
+      if (res.status === 401) {
+        // Oturum düştü: bir kez yeniden bağlanıp tekrar dene
+        sessionRef.current = null;
+        const login = await (await postApi('connect', credentials)).json();
+        if (login.status !== 'success') throw new Error(login.message);
+        sessionRef.current = login.session;
+        res = await postApi(endpoint, { session: sessionRef.current, ...payload });
+      }
       const json = await res.json();
-      if (json.status === 'error') throw new Error(json.message);
+      if (json.status === 'error' && !returnErrors) throw new Error(json.message);
       return json;
     } catch (e) {
       console.error(e);
@@ -240,6 +264,31 @@ export default function AscariDashboard() {
     }
   };
 
+  // NDJSON akışı - Her parti geldikçe onChunk çağrılır
+  const streamList = async (kind, onChunk, payload = {}) => {
+    try {
+      const res = await postApi(`list/${kind}`, { session: sessionRef.current, ...payload, stream: true });
+      const reader = res.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      for (;;) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split('\n');
+        buffer = lines.pop();
+        for (const line of lines) {
+          if (!line) continue;
+          const msg = JSON.parse(line);
+          if (msg.status === 'error') throw new Error(msg.message);
+          if (msg.data) onChunk(msg.data);
+        }
+      }
+    } catch (e) {
+      console.error(e);
+    }
+  };
+
   useEffect(() => {
     const saved = localStorage.getItem('ascari_creds');
     if (saved) { try { setCredentials(JSON.parse(saved)); setRememberMe(true); } catch (e) { } }
@@ -247,29 +296,92 @@ export default function AscariDashboard() {
 
   const handleConnect = async (e) => {
     e.preventDefault(); setLoading(true); setLoginError('');
+    sessionRef.current = null;
     const res = await apiCall('connect', {});
     if (res && res.status === 'success') {
+      sessionRef.current = res.session;
       if (rememberMe) localStorage.setItem('ascari_creds', JSON.stringify(credentials));
       setIsConnected(true);
-      refreshData(res.uid);
       if (userRole === 'sales') setActiveTab('quick_offer');
     } else setLoginError('Giriş başarısız.');
     setLoading(false);
   };
 
-  const refreshData = async (uid) => {
+  const loadedSectionsRef = useRef({}); // bölüm -> 'full' | 'partial'
+  // Ürün listesini yazan her işlem (kategori, arama) nesli artırır; eski nesle ait geç yanıtlar ve akış parçaları yok sayılır
+  const productsGenRef = useRef(0);
+  const loadTab = async (tab) => {
+    const wanted = TAB_SECTIONS[tab] || {};
+    const missing = Object.keys(wanted).filter(s => !loadedSectionsRef.current[s] || (!wanted[s] && loadedSectionsRef.current[s] !== 'full'));
+    if (!missing.length) return;
+    const fields = {};
+    missing.forEach(s => { if (wanted[s]) fields[s] = wanted[s]; loadedSectionsRef.current[s] = wanted[s] ? 'partial' : 'full'; });
     setLoadingData(true);
-    const res = await apiCall('dashboard-data', { uid });
-    if (res) setData(prev => ({ ...prev, ...res }));
+    const gen = productsGenRef.current;
+    const res = await apiCall('dashboard-data', { sections: missing, fields });
     setLoadingData(false);
+    if (!res || res.error) { missing.forEach(s => delete loadedSectionsRef.current[s]); return; }
+    // Bu arada tam veri gelmişse kısmi yanıt onu ezmesin
+    const loaded = {};
+    missing.forEach(s => { if (loadedSectionsRef.current[s] === (wanted[s] ? 'partial' : 'full')) loaded[s] = res[s]; });
+    // Kullanıcı bu arada kategori seçtiyse veya arama yaptıysa süzülmüş liste ezilmesin
+    if (productsGenRef.current !== gen) delete loaded.products;
+    setData(prev => ({ ...prev, ...loaded }));
+    // Dashboard ürün limiti dolduysa katalogun tamamını parça parça çek
+    const initialCount = loaded.products ? loaded.products.length : 0;
+    if (initialCount >= 1000) {
+      const all = [];
+      await streamList('products', chunk => {
+        all.push(...chunk);
+        if (all.length > initialCount && productsGenRef.current === gen) setData(prev => ({ ...prev, products: [...all] }));
+      }, { limit: 500 });
+    }
+  };
+
+  useEffect(() => { if (isConnected) loadTab(activeTab); }, [isConnected, activeTab]);
+
+  // Yüklenmiş bölümler sadece değişen kayıtlarla güncellenir; ürün listesi arama/kategori sonucu olabileceği için yeni ürün eklenmez
+  const syncTokenRef = useRef(null);
+  const applyChanges = (changes) => {
+    // Değişen siparişlerin önbellekteki satırları eskimiştir
+    (changes.orders?.changed || []).forEach(o => delete orderLinesRef.current[o.id_raw]);
+    setData(prev => {
+      const next = { ...prev };
+      Object.entries(changes).forEach(([section, { changed, removed }]) => {
+        if (!loadedSectionsRef.current[section]) return;
+        const key = CHANGE_KEYS[section];
+        const updates = new Map(changed.map(r => [r[key], r]));
+        const gone = new Set(removed);
+        const rows = prev[section].filter(r => !gone.has(r[key])).map(r => updates.has(r[key]) ? { ...r, ...updates.get(r[key]) } : r);
+        const known = new Set(rows.map(r => r[key]));
+        next[section] = section === 'products' ? rows : [...changed.filter(r => !known.has(r[key])), ...rows];
+      });
+      return next;
+    });
   };
 
+  useEffect(() => {
+    if (!isConnected) return;
+    let stopped = false;
+    const poll = async () => {
+      const res = await apiCall('changes', syncTokenRef.current ? { since: syncTokenRef.current } : {});
+      if (stopped || !res) return;
+      syncTokenRef.current = res.token;
+      applyChanges(res.changes);
+      if (res.more) poll();
+    };
+    poll();
+    const timer = setInterval(poll, CHANGES_POLL_MS);
+    return () => { stopped = true; clearInterval(timer); };
+  }, [isConnected]);
+
   const performSearch = async (model, query) => {
     if (!query || query.length < 2) return;
     setLoadingData(true);
-    const res = await apiCall('search', { model, query });
+    const gen = model === 'product.product' ? ++productsGenRef.current : null;
+    const res = await apiCall('search', model === 'product.product' && selectedCategoryId ? { model, query, categ_id: selectedCategoryId } : { model, query });
     if (res && res.status === 'success') {
-      if (model === 'product.product') {
+      if (model === 'product.product' && gen === productsGenRef.current) {
         setData(prev => ({ ...prev, products: res.data }));
         setInitialProductsLoaded(true);
       }
@@ -279,13 +391,40 @@ export default function AscariDashboard() {
     setLoadingData(false);
   };
 
+  // Kategori seçilince ürünler alt kategoriler dahil sunucuda süzülüp getirilir
+  const selectCategory = async (categId) => {
+    setSelectedCategoryId(categId);
+    setInitialProductsLoaded(true);
+    setLoadingData(true);
+    const gen = ++productsGenRef.current;
+    const res = await apiCall('search', { model: 'product.product', query: '', categ_id: categId });
+    if (res && res.status === 'success' && gen === productsGenRef.current) setData(prev => ({ ...prev, products: res.data }));
+    setLoadingData(false);
+  };
+
+  // Sipariş satırları önbelleği: satış listesi açılınca görünen siparişlerin satırları tek istekle çekilir
+  const orderLinesRef = useRef({}); // order id -> satırlar
+  const prefetchOrderLines = async (orderIds) => {
+    const missing = orderIds.filter(id => !orderLinesRef.current[id]);
+    if (!missing.length) return;
+    const res = await apiCall('order-details', { order_ids: missing });
+    if (res && res.orders) Object.assign(orderLinesRef.current, res.orders);
+  };
+
   const fetchOrderDetails = async (orderId) => {
+    if (orderLinesRef.current[orderId]) { setSelectedOrderLines(orderLinesRef.current[orderId]); return; }
     setLoadingData(true);
-    const res = await apiCall('order-details', { order_id: orderId });
-    if (res) setSelectedOrderLines(res.lines);
+    await prefetchOrderLines([orderId]);
+    setSelectedOrderLines(orderLinesRef.current[orderId] || []);
     setLoadingData(false);
   };
 
+  useEffect(() => {
+    if (activeTab !== 'sales' || !data.orders.length) return;
+    const visible = data.orders.filter(o => salesFilter === 'all' ? true : salesFilter === 'sale' ? ['sale', 'done'].includes(o.status) : o.status === 'draft');
+    prefetchOrderLines(visible.slice(0, 200).map(o => o.id_raw));
+  }, [activeTab, data.orders, salesFilter]);
+
   const updateTicketStatus = async (ticketId, newStatus) => {
     setData(prev => ({
       ...prev,
@@ -518,7 +657,10 @@ export default function AscariDashboard() {
   const createQuickOffer = async () => {
     const total = quickCart.reduce((sum, i) => sum + (i.list_price * i.qty), 0);
     const discountedTotal = applyDiscount ? total / 1.15 : total;
-    const quote_code = 'ASC-' + Math.floor(1000 + Math.random() * 9000); // 4 haneli (1000-9999)
+    // 8 karakterlik rastgele kod (~10^12 olasılık); karışabilecek 0/O ve 1/I kullanılmaz
+    const alphabet = '23456789ABCDEFGHJKLMNPQRSTUVWXYZ';
+    const quote_code = 'ASC-' + Array.from(crypto.getRandomValues(new Uint8Array(8)), b => alphabet[b % alphabet.length]).join('');
+    const idempotency_key = crypto.randomUUID(); // Bu gönderim için; yeniden denemelerde aynı kalır
 
     const offerData = {
       code: quote_code,
@@ -540,6 +682,7 @@ export default function AscariDashboard() {
       setLoadingData(true);
       const res = await apiCall('create-quote', {
         quote_code: quote_code,
+        idempotency_key,
         customer_name: tempCustomerName || 'Sayın Ziyaretçi',
         customer_phone: tempCustomerPhone || '',
         items: quickCart.map(item => ({
@@ -547,31 +690,30 @@ export default function AscariDashboard() {
           qty: item.qty,
           list_price: item.list_price
         }))
-      });
+      }, { returnErrors: true });
 
       if (res && res.status === 'success') {
         console.log('Teklif Odoo\'ya kaydedildi:', res.order_id);
-        // Başarı bildirimi göster (isteğe bağlı)
+      } else {
+        // Teklif ekranda gösterilir ama Odoo'ya kaydedilemediyse kullanıcı bilmeli
+        alert('Teklif Odoo\'ya kaydedilemedi: ' + (res?.message || 'Bağlantı hatası'));
       }
     } catch (e) {
       console.error('Odoo kayıt hatası:', e);
-      // Kullanıcıya uyarı vermek istemiyoruz, teklif yine de gösterilecek
     } finally {
       setLoadingData(false);
     }
   };
 
-  const handleLogout = () => { setIsConnected(false); setActiveTab('dashboard'); setData(INITIAL_DATA); };
+  const handleLogout = () => { if (sessionRef.current) apiCall('logout', {}); sessionRef.current = null; loadedSectionsRef.current = {}; syncTokenRef.current = null; orderLinesRef.current = {}; setIsConnected(false); setActiveTab('dashboard'); setData(INITIAL_DATA); };
 
   // 1. HIZLI TEKLİF & ÜRÜN LİSTESİ - Responsive
   const renderProductGrid = (isOfferMode) => {
     // İlk yüklemede ürün gösterme - sadece arama veya kategori seçince göster
     let filtered = [];
     if (initialProductsLoaded || selectedCategoryId || productSearch) {
-      filtered = data.products.filter(p => {
-        const catMatch = !selectedCategoryId || (p.categ_path && p.categ_path.includes(String(selectedCategoryId)));
-        return catMatch;
-      });
+      // Kategori süzgeci sunucuda uygulanır (selectCategory), burada liste olduğu gibi gösterilir
+      filtered = data.products;
     }
 
     if (quickOfferDetails) {
@@ -605,7 +747,7 @@ export default function AscariDashboard() {
         {/* Categories - Hide on mobile, show as drawer or toggle */}
         <div className="hidden lg:block lg:w-1/4 bg-white rounded-xl shadow-sm border border-slate-200 flex-col">
           <div className="p-4 border-b font-bold text-slate-700 bg-slate-50 rounded-t-xl">Kategoriler</div>
-          <div className="p-2 flex-1 overflow-y-auto"><CategoryTree categories={data.categories} selectedId={selectedCategoryId} onSelect={(id) => { setSelectedCategoryId(id); setInitialProductsLoaded(true); }} /></div>
+          <div className="p-2 flex-1 overflow-y-auto"><CategoryTree categories={data.categories} selectedId={selectedCategoryId} onSelect={selectCategory} /></div>
         </div>
 
         {/* Products */}
@@ -679,9 +821,8 @@ export default function AscariDashboard() {
                   categories={data.categories}
                   selectedId={selectedCategoryId}
                   onSelect={(id) => {
-                    setSelectedCategoryId(id);
-                    setInitialProductsLoaded(true);
                     setIsMobileCategoryOpen(false);
+                    selectCategory(id);
                   }}
                 />
               </div>
@@ -961,7 +1102,7 @@ export default function AscariDashboard() {
         <div className="bg-white rounded-xl shadow-2xl max-w-2xl w-full p-8 relative" onClick={e => e.stopPropagation()}>
           <button onClick={() => setSelectedProduct(null)} className="absolute top-4 right-4 text-slate-400 hover:text-slate-800"><X /></button>
           <div className="flex gap-8 items-start">
-            <div className="w-1/3 bg-slate-50 rounded flex items-center justify-center p-4 h-64 border">{selectedProduct.image_128 ? <img src={`data:image/png;base64,${selectedProduct.image_128}`} className="max-w-full max-h-full object-contain" /> : <Package className="w-20 h-20 text-slate-300" />}</div>
+            <div className="w-1/3 bg-slate-50 rounded flex items-center justify-center p-4 h-64 border">{selectedProduct.image_url ? <img src={`/img/product/${selectedProduct.id}/512`} className="max-w-full max-h-full object-contain" /> : <Package className="w-20 h-20 text-slate-300" />}</div>
             <div className="w-2/3 space-y-6">
               <div><h2 className="text-2xl font-bold text-slate-900">{selectedProduct.name}</h2><p className="text-slate-500 font-mono mt-1">{selectedProduct.default_code}</p></div>
               <div className="grid grid-cols-2 gap-4 text-sm">